@@ -0,0 +1,65 @@
+import asyncio
+import os
+from collections.abc import AsyncGenerator, Callable, Coroutine, Generator
+from typing import Any
+
+os.environ["ENV"] = "testing"
+
+import pytest
+
+from fastapi_2fa_example.postgres import AsyncSession, create_async_engine
+from fastapi_2fa_example.redis import Redis, create_redis_pool
+from tests.fixtures.database import initialize_test_database  # noqa: F401
+
+type RunFixture = Callable[[Callable[[], Coroutine[Any, Any, Any]]], Any]
+
+
+@pytest.fixture(scope="session")
+def runner() -> Generator[asyncio.Runner]:
+    """Event loop driving the async code under benchmark from sync tests."""
+    with asyncio.Runner(loop_factory=asyncio.new_event_loop) as runner:
+        yield runner
+
+
+def _enter[T](runner: asyncio.Runner, agen: AsyncGenerator[T]) -> Generator[T]:
+    yield runner.run(anext(agen))
+    runner.run(anext(agen, None))
+
+
+async def _redis() -> AsyncGenerator[Redis]:
+    async with (
+        create_redis_pool("benchmark") as pool,
+        Redis(connection_pool=pool) as redis,
+    ):
+        yield redis
+
+
+async def _session() -> AsyncGenerator[AsyncSession]:
+    from fastapi_2fa_example.config import settings
+
+    engine = create_async_engine(process_name="test", settings=settings)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        yield AsyncSession(bind=connection, expire_on_commit=False)
+        await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.fixture
+def redis(runner: asyncio.Runner) -> Generator[Redis]:
+    yield from _enter(runner, _redis())
+
+
+@pytest.fixture
+def session(runner: asyncio.Runner) -> Generator[AsyncSession]:
+    yield from _enter(runner, _session())
+
+
+@pytest.fixture
+def run(benchmark: Any, runner: asyncio.Runner) -> RunFixture:
+    """Benchmark a coroutine function: `run(lambda: service.call(...))`."""
+
+    def _run(fn: Callable[[], Coroutine[Any, Any, Any]]) -> Any:
+        return benchmark(lambda: runner.run(fn()))
+
+    return _run
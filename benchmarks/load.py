@@ -0,0 +1,252 @@
+"""
+Load generator for the auth flows.
+
+Every virtual user runs register -> login -> verify-2fa -> /users/me, with
+`--concurrency` users in flight. The OTP is read from Redis, so the target server
+must use the same Redis as this script.
+
+By default the requests go in-process to the ASGI app (lifespan included, rate
+limiting disabled); use `--url` to load a running server instead (start it with
+RATE_LIMIT_ENABLED=false). Throughput and latency percentiles are printed for
+each step and saved as JSON with `--output`.
+
+Usage:
+    python -m benchmarks.load --users 200 --concurrency 20 --output results.json
+    python -m benchmarks.load --url http://localhost:8000 --users 200
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+from starlette.types import Receive, Scope, Send
+
+from fastapi_2fa_example.auth.service import otp_service
+from fastapi_2fa_example.auth.utils import decode_token
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.redis import Redis, create_redis_pool
+
+STEPS = ("register", "login", "verify_2fa", "users_me")
+
+
+@dataclass
+class StepStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> dict[str, float | int]:
+        latencies = sorted(self.latencies)
+        if len(latencies) < 2:  # quantiles need two data points
+            latencies = latencies * 2 or [0.0, 0.0]
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput_rps": len(self.latencies) / elapsed,
+            "mean_ms": statistics.fmean(latencies) * 1000,
+            "p50_ms": percentiles[49] * 1000,
+            "p95_ms": percentiles[94] * 1000,
+            "p99_ms": percentiles[98] * 1000,
+        }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, redis: Redis) -> None:
+        self.client = client
+        self.redis = redis
+        self.stats: defaultdict[str, StepStats] = defaultdict(StepStats)
+
+    async def _step(
+        self, step: str, request: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response | None:
+        start = time.perf_counter()
+        response = await request()
+        latency = time.perf_counter() - start
+        if response.is_error:
+            self.stats[step].errors += 1
+            return None
+        self.stats[step].latencies.append(latency)
+        return response
+
+    async def user_flow(self) -> None:
+        email = f"load-{uuid.uuid4().hex}@example.com"
+        password = "password"
+        register = await self._step(
+            "register",
+            lambda: self.client.post(
+                "/api/v1/auth/register",
+                json={
+                    "email": email,
+                    "password": password,
+                    "name": "Load",
+                    "surname": "Test",
+                    "requires_2fa": True,
+                },
+            ),
+        )
+        if register is None:
+            return
+
+        login = await self._step(
+            "login",
+            lambda: self.client.post(
+                "/api/v1/auth/login", json={"email": email, "password": password}
+            ),
+        )
+        if login is None:
+            return
+        tmp_token = login.json()["tmp_token"]
+        otp = await otp_service.get_by_user_id(
+            redis=self.redis, user_id=decode_token(tmp_token).user_id
+        )
+        if otp is None:
+            self.stats["verify_2fa"].errors += 1
+            return
+
+        verify = await self._step(
+            "verify_2fa",
+            lambda: self.client.post(
+                "/api/v1/auth/verify-2fa",
+                json={"tmp_token": tmp_token, "otp": otp.otp},
+            ),
+        )
+        if verify is None:
+            return
+        access_token = verify.json()["access_token"]
+
+        await self._step(
+            "users_me",
+            lambda: self.client.get(
+                "/api/v1/users/me",
+                headers={"Authorization": f"Bearer {access_token}"},
+            ),
+        )
+
+    async def run(self, users: int, concurrency: int) -> dict[str, Any]:
+        """Run `users` user flows, `concurrency` at a time.
+
+        Args:
+            users (int): The number of user flows to run.
+            concurrency (int): The number of user flows in flight.
+
+        Returns:
+            dict[str, Any]: The statistics of the run, per step.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited_flow() -> None:
+            async with semaphore:
+                await self.user_flow()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited_flow() for _ in range(users)))
+        elapsed = time.perf_counter() - start
+
+        return {
+            "users": users,
+            "concurrency": concurrency,
+            "elapsed_seconds": elapsed,
+            "flows_per_second": users / elapsed,
+            "steps": {step: self.stats[step].summary(elapsed) for step in STEPS},
+        }
+
+
+@asynccontextmanager
+async def asgi_client(timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    """Client calling the app in-process, with its lifespan state."""
+
+    from fastapi_2fa_example.main import app
+
+    # every virtual user comes from the same address: rate limiting is turned off
+    # for the run only, the previous value is restored afterwards
+    rate_limit_enabled = settings.RATE_LIMIT_ENABLED
+    settings.RATE_LIMIT_ENABLED = False
+    try:
+        async with app.router.lifespan_context(app) as state:
+
+            async def app_with_state(
+                scope: Scope, receive: Receive, send: Send
+            ) -> None:
+                scope["state"] = dict(state or {})
+                await app(scope, receive, send)
+
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app_with_state),
+                base_url="http://benchmark",
+                timeout=timeout,
+            ) as client:
+                yield client
+    finally:
+        settings.RATE_LIMIT_ENABLED = rate_limit_enabled
+
+
+def print_report(results: dict[str, Any]) -> None:
+    sys.stdout.write(
+        f"{results['users']} users, concurrency {results['concurrency']}: "
+        f"{results['elapsed_seconds']:.2f}s, {results['flows_per_second']:.1f} flows/s\n"
+    )
+    sys.stdout.write(
+        f"{'step':<12}{'requests':>10}{'errors':>8}{'rps':>10}"
+        f"{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}\n"
+    )
+    for step, stats in results["steps"].items():
+        sys.stdout.write(
+            f"{step:<12}{stats['requests']:>10}{stats['errors']:>8}"
+            f"{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}\n"
+        )
+
+
+async def run(
+    url: str | None, users: int, concurrency: int, timeout: float
+) -> dict[str, Any]:
+    async with create_redis_pool(process_name="benchmark") as redis_pool:
+        async with Redis(connection_pool=redis_pool) as redis:
+            client_context: AbstractAsyncContextManager[httpx.AsyncClient] = (
+                asgi_client(timeout)
+                if url is None
+                else httpx.AsyncClient(base_url=url, timeout=timeout)
+            )
+            async with client_context as client:
+                return await LoadTest(client=client, redis=redis).run(
+                    users=users, concurrency=concurrency
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--url", default=None, help="Base URL of a running server (default: ASGI)"
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", type=Path, default=None, help="JSON results file")
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run(
+            url=args.url,
+            users=args.users,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+        )
+    )
+    print_report(results)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+from typing import Any
+
+from fastapi_2fa_example.auth.schemas import TokenType
+from fastapi_2fa_example.auth.utils import (
+    create_jwt_token,
+    decode_token,
+    generate_otp,
+    password_hasher,
+)
+
+
+def test_hash_password(benchmark: Any) -> None:
+    benchmark(password_hasher.hash, "password")
+
+
+def test_verify_password(benchmark: Any) -> None:
+    password_hash = password_hasher.hash("password")
+    assert benchmark(password_hasher.verify, "password", password_hash)
+
+
+def test_create_jwt_token(benchmark: Any) -> None:
+    benchmark(create_jwt_token, user_id=1, type=TokenType.ACCESS)
+
+
+def test_decode_token(benchmark: Any) -> None:
+    token = create_jwt_token(user_id=1, type=TokenType.ACCESS)
+    assert benchmark(decode_token, token).user_id == 1
+
+
+def test_generate_otp(benchmark: Any) -> None:
+    benchmark(generate_otp)
@@ -0,0 +1,61 @@
+"""
+JSON serialization of a page of users: FastAPI's `response_model` path
+(validation, `jsonable_encoder`, stdlib `json`), the same path rendered with
+orjson, and the `json_response` fast path, fed like GET /users with the selected
+columns, built into users without revalidation.
+"""
+
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from fastapi_2fa_example.models.user import User as UserModel
+from fastapi_2fa_example.responses import json_response
+from fastapi_2fa_example.users.schemas import User
+
+USERS_ADAPTER = TypeAdapter(list[User])
+USERS = [
+    UserModel(
+        id=i,
+        email=f"user{i}@example.com",
+        name="Name",
+        surname="Surname",
+        password_hash="hash",
+        requires_2fa=i % 2 == 0,
+    )
+    for i in range(1000)
+]
+ROWS = [
+    {column: getattr(user, column) for column in User.model_fields} for user in USERS
+]
+
+
+def response_model_path(response_class: type[JSONResponse]) -> Callable[[], bytes]:
+    def render() -> bytes:
+        value = USERS_ADAPTER.validate_python(USERS, from_attributes=True)
+        content = jsonable_encoder(USERS_ADAPTER.dump_python(value, mode="json"))
+        return bytes(response_class(content).body)
+
+    return render
+
+
+def fast_path() -> bytes:
+    users = [User.model_construct(**row) for row in ROWS]
+    return bytes(json_response(USERS_ADAPTER, users).body)
+
+
+@pytest.mark.parametrize(
+    "render",
+    [
+        pytest.param(response_model_path(JSONResponse), id="json"),
+        pytest.param(response_model_path(ORJSONResponse), id="orjson"),
+        pytest.param(fast_path, id="model_dump_json"),
+    ],
+)
+def test_serialize_users(benchmark: Any, render: Callable[[], bytes]) -> None:
+    body = benchmark(render)
+    assert body.startswith(b'[{"email":"user0@example.com"')
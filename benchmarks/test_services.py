@@ -0,0 +1,45 @@
+import asyncio
+import itertools
+
+from fastapi_2fa_example.auth.schemas import OTP, OTPVerification
+from fastapi_2fa_example.auth.service import otp_service
+from fastapi_2fa_example.auth.utils import password_hasher
+from fastapi_2fa_example.postgres import AsyncSession
+from fastapi_2fa_example.redis import Redis
+from fastapi_2fa_example.users.schemas import UserCreate
+from fastapi_2fa_example.users.service import user_service
+
+from .conftest import RunFixture
+
+
+def test_otp_add(run: RunFixture, redis: Redis) -> None:
+    run(lambda: otp_service.add(redis=redis, otp=OTP(user_id=1, otp="123456")))
+
+
+def test_otp_add_and_consume(run: RunFixture, redis: Redis) -> None:
+    tokens = (f"token-{i}" for i in itertools.count())
+
+    async def add_and_consume() -> OTPVerification:
+        await otp_service.add(redis=redis, otp=OTP(user_id=1, otp="123456"))
+        return await otp_service.consume(
+            redis=redis, user_id=1, otp="123456", tmp_token=next(tokens)
+        )
+
+    assert run(add_and_consume) == OTPVerification.MATCH
+
+
+def test_user_get_by_email(
+    run: RunFixture, runner: asyncio.Runner, session: AsyncSession
+) -> None:
+    user_create = UserCreate(
+        email="benchmark@example.com",
+        name="Bench",
+        surname="Mark",
+        password_hash=password_hasher.hash("password"),
+    )
+    runner.run(user_service.add(session=session, user_create=user_create))
+
+    user = run(
+        lambda: user_service.get_by_email(session=session, email=user_create.email)
+    )
+    assert user is not None
@@ -3,5 +3,5 @@
 # Apply database migrations
 /app/.venv/bin/alembic upgrade head
 
-# Start the FastAPI application
-/app/.venv/bin/fastapi run fastapi_2fa_example/main.py --host 0.0.0.0 --port 8000
+# Start the FastAPI application (one worker per core)
+/app/.venv/bin/python -m fastapi_2fa_example.server
@@ -0,0 +1,67 @@
+"""
+Measure the cost of password hashing configurations on the current host.
+
+Usage:
+    python -m fastapi_2fa_example.auth.calibrate --rounds 5000 100000 535000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from fastapi_2fa_example.config import settings
+
+from .utils import PasswordHasher
+
+
+def measure(hasher: PasswordHasher, samples: int) -> list[float]:
+    """Return the duration (ms) of `samples` hash computations."""
+
+    durations: list[float] = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Report p50/p99 password hashing time per configuration."
+    )
+    parser.add_argument(
+        "--schemes",
+        nargs="+",
+        default=settings.PASSWORD_HASH_SCHEMES[:1],
+        help="passlib schemes to measure (default: the configured scheme)",
+    )
+    parser.add_argument(
+        "--rounds",
+        nargs="+",
+        type=int,
+        default=[settings.PASSWORD_HASH_ROUNDS]
+        if settings.PASSWORD_HASH_ROUNDS
+        else [],
+        help="rounds to measure for each scheme (default: the configured rounds)",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=20, help="hashes per configuration"
+    )
+    args = parser.parse_args(argv)
+
+    rounds_list: list[int | None] = args.rounds or [None]
+
+    sys.stdout.write(f"{'scheme':<16}{'rounds':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}\n")
+    for scheme in args.schemes:
+        for rounds in rounds_list:
+            durations = measure(PasswordHasher([scheme], rounds), args.samples)
+            percentiles = statistics.quantiles(durations, n=100, method="inclusive")
+            sys.stdout.write(
+                f"{scheme:<16}{rounds or 'default':>10}"
+                f"{percentiles[49]:>12.1f}{percentiles[98]:>12.1f}\n"
+            )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
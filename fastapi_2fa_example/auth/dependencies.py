@@ -1,21 +1,103 @@
+import hashlib
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
 
+from fastapi_2fa_example.config import settings
 from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.metrics import TOKEN_CACHE_HITS, TOKEN_CACHE_MISSES
+from fastapi_2fa_example.rate_limit import Limit, rate_limiter
+from fastapi_2fa_example.redis import RedisAsyncConnectionPool, get_redis_pool
 
-from .schemas import Token, TokenType
+from .schemas import LoginRequest, RegisterRequest, Token, TokenType
 from .utils import decode_token
 
 bearer_scheme = HTTPBearer()
+admin_key_scheme = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of decoded JWT tokens, keyed by the SHA-256 digest of the token.
+
+    Entries expire after `ttl_seconds` and never outlive the token expiration time,
+    so an expired token is always decoded (and rejected) again.
+    Sync dependencies run in a thread pool, so every access is guarded by a lock.
+    Hits and misses are also exported as `token_cache_hits_total` and
+    `token_cache_misses_total`.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[Token, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token_str: str) -> bytes:
+        return hashlib.sha256(token_str.encode()).digest()
+
+    def get(self, token_str: str) -> Token | None:
+        key = self._key(token_str)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    TOKEN_CACHE_HITS.inc()
+                    return token
+                del self._entries[key]
+            self.misses += 1
+            TOKEN_CACHE_MISSES.inc()
+            return None
+
+    def set(self, token_str: str, token: Token) -> None:
+        if self.max_size <= 0:
+            return
+
+        expires_at = min(time.time() + self.ttl_seconds, token.exp.timestamp())
+        if expires_at <= time.time():
+            return
+
+        key = self._key(token_str)
+        with self._lock:
+            self._entries[key] = (token, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+)
 
 
 class TokenValidator:
     """Dependency class to validate JWT tokens."""
 
-    def __init__(self, token_type: TokenType):
+    def __init__(self, token_type: TokenType, cache: TokenCache | None = None):
         self.token_type = token_type
+        self.cache = cache
 
     def __call__(
         self,
@@ -24,7 +106,13 @@ class TokenValidator:
         """Validate the JWT token and ensure it matches the expected type."""
 
         try:
-            decoded_token = decode_token(token.credentials)
+            decoded_token = None
+            if self.cache is not None:
+                decoded_token = self.cache.get(token.credentials)
+            if decoded_token is None:
+                decoded_token = decode_token(token.credentials)
+                if self.cache is not None:
+                    self.cache.set(token.credentials, decoded_token)
             if decoded_token.type != self.token_type:
                 raise ValueError(
                     f"Invalid token type: expected {self.token_type}, got {decoded_token.type}"
@@ -38,4 +126,75 @@ class TokenValidator:
             )
 
 
-validate_access_token = TokenValidator(TokenType.ACCESS)
+validate_access_token = TokenValidator(TokenType.ACCESS, cache=token_cache)
+
+
+def validate_admin_key(
+    admin_key: Annotated[str | None, Depends(admin_key_scheme)],
+) -> None:
+    """Ensure the request carries the admin API key (admin endpoints are disabled
+    when ADMIN_API_KEY is not set)."""
+
+    expected = settings.ADMIN_API_KEY
+    if (
+        expected is None
+        or admin_key is None
+        or not secrets.compare_digest(
+            admin_key.encode(), expected.get_secret_value().encode()
+        )
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key"
+        )
+
+
+async def enforce_rate_limit(
+    request: Request,
+    redis_pool: RedisAsyncConnectionPool,
+    route: str,
+    email: str | None = None,
+) -> None:
+    """Reject the request with 429 if the client IP or the email exceeded the
+    rate limit of the route."""
+
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    ip = request.client.host if request.client else "unknown"
+    limits = [Limit(f"{route}:ip:{ip}", settings.RATE_LIMIT_IP_PER_MINUTE)]
+    if email is not None:
+        limits.append(
+            Limit(
+                f"{route}:email:{email.lower()}", settings.RATE_LIMIT_EMAIL_PER_MINUTE
+            )
+        )
+    retry_after = await rate_limiter.hit(redis_pool, limits)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+async def rate_limit_register(
+    request: Request,
+    register_request: RegisterRequest,
+    redis_pool: Annotated[RedisAsyncConnectionPool, Depends(get_redis_pool)],
+) -> None:
+    await enforce_rate_limit(request, redis_pool, "register", register_request.email)
+
+
+async def rate_limit_login(
+    request: Request,
+    login_request: LoginRequest,
+    redis_pool: Annotated[RedisAsyncConnectionPool, Depends(get_redis_pool)],
+) -> None:
+    await enforce_rate_limit(request, redis_pool, "login", login_request.email)
+
+
+async def rate_limit_verify_2fa(
+    request: Request,
+    redis_pool: Annotated[RedisAsyncConnectionPool, Depends(get_redis_pool)],
+) -> None:
+    await enforce_rate_limit(request, redis_pool, "verify_2fa")
@@ -0,0 +1,100 @@
+import functools
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi_2fa_example.config import Settings, settings
+
+SYMMETRIC_ALGORITHMS = frozenset({"HS256", "HS384", "HS512"})
+ASYMMETRIC_ALGORITHMS = frozenset({"RS256", "RS384", "RS512", "EdDSA"})
+
+
+@dataclass(frozen=True)
+class JWTKeys:
+    """
+    Parsed keys used to sign and verify JWT tokens.
+
+    Keys are parsed once at startup, so signing and verification never re-read or
+    re-parse the settings. `verification_keys` maps every accepted "kid" to its key:
+    the current key plus the rotated public keys that are still valid.
+    """
+
+    algorithm: str
+    kid: str
+    signing_key: Any
+    verification_keys: dict[str, Any]
+    jwks: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+
+    def get_verification_key(self, kid: str | None) -> Any:
+        """Return the key matching `kid` (tokens without "kid" use the current key)."""
+
+        if kid is None:
+            return self.verification_keys[self.kid]
+        try:
+            return self.verification_keys[kid]
+        except KeyError as e:
+            raise ValueError(f"Unknown key id: {kid}") from e
+
+
+def _public_jwk(algorithm: str, kid: str, public_key: Any) -> dict[str, Any]:
+    from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+    if algorithm == "EdDSA":
+        jwk = OKPAlgorithm.to_jwk(public_key, as_dict=True)
+    else:
+        jwk = RSAAlgorithm.to_jwk(public_key, as_dict=True)
+    return {**jwk, "kid": kid, "alg": algorithm, "use": "sig"}
+
+
+def load_jwt_keys(settings: Settings) -> JWTKeys:
+    """Parse the JWT keys from the settings."""
+
+    algorithm = settings.JWT_ALGORITHM
+    kid = settings.JWT_KEY_ID
+
+    if algorithm in SYMMETRIC_ALGORITHMS:
+        secret = settings.JWT_SECRET.get_secret_value().encode()
+        # Shared secrets are never published in the JWKS
+        return JWTKeys(
+            algorithm=algorithm,
+            kid=kid,
+            signing_key=secret,
+            verification_keys={kid: secret},
+            jwks={"keys": []},
+        )
+
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+    if settings.JWT_PRIVATE_KEY is None:
+        raise ValueError(f"JWT_PRIVATE_KEY is required by the {algorithm} algorithm")
+
+    from cryptography.hazmat.primitives.serialization import (
+        load_pem_private_key,
+        load_pem_public_key,
+    )
+
+    private_key = load_pem_private_key(
+        settings.JWT_PRIVATE_KEY.get_secret_value().encode(), password=None
+    )
+    verification_keys: dict[str, Any] = {
+        rotated_kid: load_pem_public_key(pem.encode())
+        for rotated_kid, pem in settings.JWT_PUBLIC_KEYS.items()
+    }
+    verification_keys[kid] = private_key.public_key()
+
+    return JWTKeys(
+        algorithm=algorithm,
+        kid=kid,
+        signing_key=private_key,
+        verification_keys=verification_keys,
+        jwks={
+            "keys": [
+                _public_jwk(algorithm, key_id, public_key)
+                for key_id, public_key in verification_keys.items()
+            ]
+        },
+    )
+
+
+@functools.cache
+def get_jwt_keys() -> JWTKeys:
+    return load_jwt_keys(settings)
@@ -1,20 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import httpx
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.http_client import get_http_client
 from fastapi_2fa_example.logger import logger
-from fastapi_2fa_example.mail_sender import send_email
-from fastapi_2fa_example.postgres import AsyncSession, get_db_session
+from fastapi_2fa_example.mail_queue import mail_queue
+from fastapi_2fa_example.mail_sender import EmailMessage, send_email
+from fastapi_2fa_example.metrics import OTP_FAILED, OTP_ISSUED, OTP_VERIFIED
+from fastapi_2fa_example.postgres import (
+    AsyncSession,
+    AsyncSessionMaker,
+    get_db_session,
+    get_db_session_from_pool,
+    get_db_sessionmaker,
+)
 from fastapi_2fa_example.redis import (
     RedisAsyncConnectionPool,
     get_redis_client_from_pool,
     get_redis_pool,
 )
+from fastapi_2fa_example.tracing import tracer
 from fastapi_2fa_example.users.schemas import UserCreate
 from fastapi_2fa_example.users.service import user_service
 
+from .dependencies import (
+    rate_limit_login,
+    rate_limit_register,
+    rate_limit_verify_2fa,
+)
 from .schemas import (
     OTP,
     LoginRequest,
     LoginResponse,
+    OTPVerification,
     RegisterRequest,
     RegisterResponse,
     TokenType,
@@ -23,11 +41,13 @@ from .schemas import (
 )
 from .service import otp_service
 from .utils import (
+    HashingPoolExhaustedException,
     create_jwt_token,
     decode_token,
     generate_otp,
-    hash_password,
-    verify_password,
+    hash_password_async,
+    password_needs_update,
+    verify_password_async,
 )
 
 router = APIRouter(
@@ -36,83 +56,154 @@ router = APIRouter(
 )
 
 
+async def rehash_password(
+    sessionmaker: AsyncSessionMaker, user_id: int, password: str
+) -> None:
+    """Upgrade the password hash of a user to the current hashing settings."""
+
+    try:
+        password_hash = await hash_password_async(password)
+        async with get_db_session_from_pool(sessionmaker) as session:
+            await user_service.update_password_hash(
+                session=session, user_id=user_id, password_hash=password_hash
+            )
+        logger.info(f"Password hash upgraded for user {user_id}")
+    except Exception as e:  # pragma: no cover
+        logger.exception(f"Failed to upgrade password hash for user {user_id}: {e}")
+
+
 @router.post(
     "/register",
+    dependencies=[Depends(rate_limit_register)],
     status_code=status.HTTP_201_CREATED,
     summary="Register a new user",
     description="Register a new user with email and password (Optionally enable 2FA).",
-    responses={status.HTTP_409_CONFLICT: {"description": "User already exists"}},
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "User already exists"},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Too many requests"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Service Unavailable"},
+    },
 )
 async def register(
-    register_request: RegisterRequest, session: AsyncSession = Depends(get_db_session)
+    register_request: RegisterRequest,
+    session: AsyncSession = Depends(get_db_session),
+    redis_pool: RedisAsyncConnectionPool = Depends(get_redis_pool),
 ) -> RegisterResponse:
-    if await user_service.get_by_email(session, register_request.email):
+    try:
+        password_hash = await hash_password_async(
+            register_request.password.get_secret_value()
+        )
+    except HashingPoolExhaustedException:
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="User already exists",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry later",
         )
 
     user_create = UserCreate(
         email=register_request.email,
-        password_hash=hash_password(register_request.password.get_secret_value()),
+        password_hash=password_hash,
         name=register_request.name,
         surname=register_request.surname,
         requires_2fa=register_request.requires_2fa,
     )
-    user = await user_service.add(session, user_create)
+    async with get_redis_client_from_pool(redis_pool) as redis:
+        user = await user_service.add_if_not_exists(session, user_create, redis=redis)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User already exists",
+        )
 
     return RegisterResponse(requires_2fa=user.requires_2fa, email=user.email)
 
 
 @router.post(
     "/login",
+    dependencies=[Depends(rate_limit_login)],
     summary="User login",
     description="Authenticate user and initiate 2FA if enabled.",
-    responses={status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"}},
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Too many requests"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Service Unavailable"},
+    },
 )
 async def login(
     login_request: LoginRequest,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_db_session),
+    sessionmaker: AsyncSessionMaker = Depends(get_db_sessionmaker),
     redis_pool: RedisAsyncConnectionPool = Depends(get_redis_pool),
+    http_client: httpx.AsyncClient = Depends(get_http_client),
 ) -> LoginResponse:
-    user = await user_service.get_by_email(session=session, email=login_request.email)
+    with tracer.start_as_current_span("user_service.get_by_email"):
+        user = await user_service.get_by_email(
+            session=session, email=login_request.email
+        )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email",
         )
-    if not verify_password(
-        password=login_request.password.get_secret_value(),
-        password_hash=user.password_hash,
-    ):
+    try:
+        with tracer.start_as_current_span("verify_password"):
+            is_valid_password = await verify_password_async(
+                password=login_request.password.get_secret_value(),
+                password_hash=user.password_hash,
+            )
+    except HashingPoolExhaustedException:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry later",
+        )
+    if not is_valid_password:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid password",
         )
+    if password_needs_update(user.password_hash):
+        background_tasks.add_task(
+            rehash_password,
+            sessionmaker=sessionmaker,
+            user_id=user.id,
+            password=login_request.password.get_secret_value(),
+        )
     if user.requires_2fa:
         otp = generate_otp()
+        email = EmailMessage(
+            to_email=user.email,
+            subject="Your OTP Code",
+            body=f"Your OTP code is: {otp}",
+        )
         async with get_redis_client_from_pool(redis_pool) as redis:
-            await otp_service.add(
-                redis=redis,
-                otp=OTP(
-                    user_id=user.id,
-                    otp=otp,
-                ),
-            )
+            with tracer.start_as_current_span("otp_service.add"):
+                await otp_service.add(
+                    redis=redis,
+                    otp=OTP(
+                        user_id=user.id,
+                        otp=otp,
+                    ),
+                )
+            OTP_ISSUED.inc()
+            if settings.MAIL_QUEUE_ENABLED:
+                # sent by the mail worker, login does not wait for the provider
+                await mail_queue.enqueue(redis=redis, message=email)
 
-        # send email
-        try:
-            await send_email(
-                to_email=user.email,
-                subject="Your OTP Code",
-                body=f"Your OTP code is: {otp}",
-            )
-        except Exception as e:  # pragma: no cover
-            logger.exception(f"Failed to send email: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to send OTP email",
-            )
+        if not settings.MAIL_QUEUE_ENABLED:
+            try:
+                with tracer.start_as_current_span("send_email"):
+                    await send_email(
+                        to_email=email.to_email,
+                        subject=email.subject,
+                        body=email.body,
+                        client=http_client,
+                    )
+            except Exception as e:  # pragma: no cover
+                logger.exception(f"Failed to send email: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to send OTP email",
+                )
 
         tmp_token = create_jwt_token(
             user_id=user.id,
@@ -128,46 +219,71 @@ async def login(
 
 @router.post(
     "/verify-2fa",
+    dependencies=[Depends(rate_limit_verify_2fa)],
     summary="Verify 2FA OTP",
     description="Verify the OTP for 2FA login.",
     responses={
         status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
         status.HTTP_400_BAD_REQUEST: {"description": "Invalid token type"},
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            "description": "Too many requests or invalid OTPs"
+        },
     },
 )
 async def verify_2fa(
     two_fa_request: TwoFARequest,
     redis_pool: RedisAsyncConnectionPool = Depends(get_redis_pool),
 ) -> TwoFAResponse:
-    try:
-        payload = decode_token(two_fa_request.tmp_token)
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-        )
-
-    if payload.type != TokenType.LOGIN:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid token type",
-        )
-
     async with get_redis_client_from_pool(redis_pool) as redis:
-        otp = await otp_service.get_by_user_id(redis=redis, user_id=payload.user_id)
-
-        if otp is None:
+        try:
+            payload = decode_token(two_fa_request.tmp_token)
+        except Exception:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="OTP expired or not found",
+                detail="Invalid token",
             )
-        if otp.otp != two_fa_request.otp:
+
+        if payload.type != TokenType.LOGIN:
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid OTP",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid token type",
+            )
+
+        # reject brute-force attempts before touching the OTP
+        if await otp_service.is_locked(
+            redis=redis, user_id=payload.user_id, tmp_token=two_fa_request.tmp_token
+        ):
+            OTP_FAILED.labels(OTPVerification.LOCKED).inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many invalid OTP attempts, please login again",
             )
 
-        await otp_service.delete(redis=redis, user_id=payload.user_id)
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=payload.user_id,
+            otp=two_fa_request.otp,
+            tmp_token=two_fa_request.tmp_token,
+        )
+
+    if verification != OTPVerification.MATCH:
+        OTP_FAILED.labels(verification).inc()
+    if verification == OTPVerification.LOCKED:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many invalid OTP attempts, please login again",
+        )
+    if verification == OTPVerification.MISSING:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="OTP expired or not found",
+        )
+    if verification == OTPVerification.MISMATCH:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid OTP",
+        )
 
+    OTP_VERIFIED.inc()
     access_token = create_jwt_token(user_id=payload.user_id, type=TokenType.ACCESS)
     return TwoFAResponse(access_token=access_token)
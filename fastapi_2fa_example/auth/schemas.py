@@ -82,6 +82,13 @@ class Token(BaseModel):
     type: TokenType = Field(..., description="Token type")
 
 
+class OTPVerification(StrEnum):
+    MATCH = "match"
+    MISMATCH = "mismatch"
+    MISSING = "missing"
+    LOCKED = "locked"
+
+
 class OTP(BaseModel):
     user_id: int = Field(..., description="User ID")
     otp: str = Field(..., min_length=6, max_length=6)
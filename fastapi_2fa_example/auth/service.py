@@ -1,10 +1,72 @@
+import hashlib
+import time
+from collections.abc import Awaitable
+from typing import cast
+
+from redis.commands.core import AsyncScript
+from redis.exceptions import ResponseError
+
 from fastapi_2fa_example.config import settings
 from fastapi_2fa_example.redis import Redis
 
-from .schemas import OTP
+from .schemas import OTP, OTPVerification
+
+# OTPs are stored as a small hash {otp, issued_at} under "otp:{user_id}".
+# OTPs stored before as a JSON string ({"user_id": ..., "otp": ...}) are still read
+# until they expire.
+
+# Compare the submitted OTP and delete it on match, in a single server-side step:
+# two concurrent requests can never both consume the same OTP.
+# Wrong attempts are counted in the OTP hash (the OTP is deleted after ARGV[2]
+# failures), per login token (KEYS[2], expiring with the token) and per user
+# (KEYS[3], ARGV[4] failures in a window of ARGV[5] seconds). The per-user count
+# is not reset by a new login, so logging in again does not buy more guesses.
+CONSUME_OTP_SCRIPT = """
+local max_attempts = tonumber(ARGV[2])
+local max_user_attempts = tonumber(ARGV[4])
+if tonumber(redis.call("GET", KEYS[2]) or "0") >= max_attempts
+    or tonumber(redis.call("GET", KEYS[3]) or "0") >= max_user_attempts then
+    return "locked"
+end
+local stored
+local key_type = redis.call("TYPE", KEYS[1]).ok
+if key_type == "hash" then
+    stored = redis.call("HGET", KEYS[1], "otp")
+elseif key_type == "string" then
+    stored = cjson.decode(redis.call("GET", KEYS[1])).otp
+else
+    return "missing"
+end
+if stored == ARGV[1] then
+    redis.call("DEL", KEYS[1], KEYS[3])
+    return "match"
+end
+
+local token_attempts = redis.call("INCR", KEYS[2])
+if token_attempts == 1 then
+    redis.call("EXPIRE", KEYS[2], ARGV[3])
+end
+local user_attempts = redis.call("INCR", KEYS[3])
+if user_attempts == 1 then
+    redis.call("EXPIRE", KEYS[3], ARGV[5])
+end
+local otp_attempts = 0
+if key_type == "hash" then
+    otp_attempts = redis.call("HINCRBY", KEYS[1], "attempts", 1)
+end
+if otp_attempts >= max_attempts or token_attempts >= max_attempts
+    or user_attempts >= max_user_attempts then
+    redis.call("DEL", KEYS[1])
+    return "locked"
+end
+return "mismatch"
+"""
 
 
 class OTPService:
+    def __init__(self) -> None:
+        self._consume_script: AsyncScript | None = None
+
     async def add(self, redis: Redis, otp: OTP) -> None:
         """Add a one-time password (OTP) to Redis.
 
@@ -13,9 +75,12 @@ class OTPService:
             otp (OTP): The OTP data to store.
         """
         key = f"otp:{otp.user_id}"
-        await redis.set(
-            name=key, value=otp.model_dump_json(), ex=settings.OTP_EXPIRE_MINUTES * 60
-        )
+        async with redis.pipeline(transaction=True) as pipe:
+            # DEL drops any previous OTP, including one stored in the legacy format
+            pipe.delete(key)
+            pipe.hset(key, mapping={"otp": otp.otp, "issued_at": int(time.time())})
+            pipe.expire(key, settings.OTP_EXPIRE_MINUTES * 60)
+            await pipe.execute()
 
     async def get_by_user_id(self, redis: Redis, user_id: int) -> OTP | None:
         """Retrieve an OTP by user ID from Redis.
@@ -28,10 +93,87 @@ class OTPService:
             OTP | None: The retrieved OTP data or None if not found.
         """
         key = f"otp:{user_id}"
-        otp_data = await redis.get(key)
-        if otp_data:
-            return OTP.model_validate_json(otp_data)
-        return None
+        try:
+            otp = await cast(Awaitable[str | None], redis.hget(key, "otp"))
+        except ResponseError:  # WRONGTYPE: legacy JSON format
+            otp_data = await redis.get(key)
+            return OTP.model_validate_json(otp_data) if otp_data else None
+        return OTP(user_id=user_id, otp=otp) if otp is not None else None
+
+    @staticmethod
+    def _attempts_key(tmp_token: str) -> str:
+        return f"otp_attempts:{hashlib.sha256(tmp_token.encode()).hexdigest()}"
+
+    @staticmethod
+    def _user_attempts_key(user_id: int) -> str:
+        return f"otp_attempts_user:{user_id}"
+
+    async def is_locked(self, redis: Redis, user_id: int, tmp_token: str) -> bool:
+        """Check whether a user or a login token has exhausted its OTP attempts.
+
+        This is a single MGET, cheap enough to run before any other work.
+
+        Args:
+            redis (Redis): The Redis client.
+            user_id (int): The user ID the login token was issued to.
+            tmp_token (str): The login token.
+
+        Returns:
+            bool: True if no more OTP attempts are allowed for this user or token.
+        """
+        token_attempts, user_attempts = await redis.mget(
+            self._attempts_key(tmp_token), self._user_attempts_key(user_id)
+        )
+        return (
+            token_attempts is not None
+            and int(token_attempts) >= settings.OTP_MAX_ATTEMPTS
+        ) or (
+            user_attempts is not None
+            and int(user_attempts) >= settings.OTP_MAX_ATTEMPTS_PER_USER
+        )
+
+    async def consume(
+        self, redis: Redis, user_id: int, otp: str, tmp_token: str
+    ) -> OTPVerification:
+        """Verify an OTP and delete it if it matches, atomically.
+
+        Wrong attempts are counted per OTP and per login token: after
+        OTP_MAX_ATTEMPTS failures the OTP is deleted and the token is locked.
+        They are also counted per user, across logins: after
+        OTP_MAX_ATTEMPTS_PER_USER failures within OTP_USER_ATTEMPTS_WINDOW_MINUTES,
+        the user is locked until the window expires. A match resets the user count.
+        The script is run with EVALSHA (its SHA is computed once), falling back to
+        loading it when the server does not know it yet.
+
+        Args:
+            redis (Redis): The Redis client.
+            user_id (int): The user ID associated with the OTP.
+            otp (str): The submitted OTP.
+            tmp_token (str): The login token the OTP is submitted with.
+
+        Returns:
+            OTPVerification: MATCH if the OTP was valid (and is now consumed),
+                MISMATCH if it is wrong, MISSING if expired or not found,
+                LOCKED if too many wrong attempts were made.
+        """
+        if self._consume_script is None:
+            self._consume_script = redis.register_script(CONSUME_OTP_SCRIPT)
+        result = await self._consume_script(
+            keys=[
+                f"otp:{user_id}",
+                self._attempts_key(tmp_token),
+                self._user_attempts_key(user_id),
+            ],
+            args=[
+                otp,
+                settings.OTP_MAX_ATTEMPTS,
+                settings.LOGIN_TOKEN_EXPIRE_MINUTES * 60,
+                settings.OTP_MAX_ATTEMPTS_PER_USER,
+                settings.OTP_USER_ATTEMPTS_WINDOW_MINUTES * 60,
+            ],
+            client=redis,
+        )
+        return OTPVerification(cast(str, result))
 
     async def delete(self, redis: Redis, user_id: int) -> None:
         """Delete an OTP by user ID from Redis.
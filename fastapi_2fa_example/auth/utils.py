@@ -1,26 +1,184 @@
+import asyncio
+import functools
+import multiprocessing
+import os
 import secrets
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
+from typing import Any, Literal
 
-import jwt
-from passlib.hash import sha256_crypt
+from passlib.context import CryptContext
 from pydantic import ValidationError
 
 from fastapi_2fa_example.config import settings
 from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.metrics import observe
 
+from .keys import get_jwt_keys
 from .schemas import Token, TokenType
 
 
+class PasswordHasher:
+    """
+    Password hashing engine backed by a passlib CryptContext.
+
+    The first scheme is used for new hashes, the others are only accepted for
+    verification and reported as needing an update. When `rounds` is set, hashes of
+    the default scheme created with a different cost need an update as well.
+    """
+
+    def __init__(self, schemes: Sequence[str], rounds: int | None = None):
+        if not schemes:
+            raise ValueError("At least one password hashing scheme is required")
+
+        self.schemes = tuple(schemes)
+        self.rounds = rounds
+
+        options: dict[str, Any] = {}
+        if rounds is not None:
+            default_scheme = self.schemes[0]
+            options[f"{default_scheme}__default_rounds"] = rounds
+            options[f"{default_scheme}__min_rounds"] = rounds
+            options[f"{default_scheme}__max_rounds"] = rounds
+
+        self._context = CryptContext(
+            schemes=list(self.schemes), deprecated="auto", **options
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # CryptContext cannot be pickled: rebuild the hasher from its configuration
+        # when it is sent to a process pool worker.
+        return (get_password_hasher, (self.schemes, self.rounds))
+
+    def hash(self, password: str) -> str:
+        return str(self._context.hash(password))
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return bool(self._context.verify(password, password_hash))
+
+    def needs_update(self, password_hash: str) -> bool:
+        """Check if a hash was created with an outdated scheme or cost."""
+        return bool(self._context.needs_update(password_hash))
+
+
+@functools.cache
+def get_password_hasher(
+    schemes: tuple[str, ...], rounds: int | None = None
+) -> PasswordHasher:
+    return PasswordHasher(schemes=schemes, rounds=rounds)
+
+
+password_hasher = get_password_hasher(
+    tuple(settings.PASSWORD_HASH_SCHEMES), settings.PASSWORD_HASH_ROUNDS
+)
+
+
 def hash_password(password: str) -> str:
     """Hash a plaintext password."""
 
-    return str(sha256_crypt.hash(password))
+    return password_hasher.hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Verify a plaintext password against a hashed password."""
 
-    return bool(sha256_crypt.verify(password, password_hash))
+    return password_hasher.verify(password, password_hash)
+
+
+def password_needs_update(password_hash: str) -> bool:
+    """Check if a hashed password should be rehashed with the current settings."""
+
+    return password_hasher.needs_update(password_hash)
+
+
+class HashingPoolExhaustedException(Exception):
+    message: str
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+class PasswordHashingPool:
+    """
+    Bounded worker pool used to run password hashing off the event loop.
+
+    Hashing is CPU-bound (and, with passlib's builtin backend, holds the GIL), so
+    the default executor is a process pool sized to the number of cores.
+    At most `max_pending` jobs can be queued or running at the same time: further
+    submissions are rejected with HashingPoolExhaustedException instead of piling up.
+    """
+
+    def __init__(
+        self,
+        executor_type: Literal["thread", "process"],
+        max_workers: int | None,
+        max_pending: int,
+    ):
+        self.executor_type = executor_type
+        self.max_workers = max_workers or os.process_cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs currently queued or running in the pool."""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hashing",
+                )
+        return self._executor
+
+    async def run[T](self, fn: Callable[..., T], *args: object) -> T:
+        """Run `fn(*args)` in the pool, rejecting the job if the queue is full."""
+
+        if self._pending >= self.max_pending:
+            raise HashingPoolExhaustedException("password hashing pool exhaustion")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        """Shut down the underlying executor (it is recreated on the next job)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = PasswordHashingPool(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.get_password_hash_workers(),
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a plaintext password in the hashing pool."""
+
+    with observe("hash_password"):
+        return await hashing_pool.run(password_hasher.hash, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    """Verify a plaintext password against a hashed password in the hashing pool."""
+
+    with observe("verify_password"):
+        return await hashing_pool.run(password_hasher.verify, password, password_hash)
 
 
 def create_jwt_token(user_id: int, type: TokenType, exp: int | None = None) -> str:
@@ -49,11 +207,16 @@ def create_jwt_token(user_id: int, type: TokenType, exp: int | None = None) -> s
         exp=datetime.now(tz=UTC) + timedelta(minutes=exp),
         type=type,
     )
-    return jwt.encode(  # pyright: ignore[reportUnknownMemberType]
-        payload=token.model_dump(),
-        key=settings.JWT_SECRET.get_secret_value(),
-        algorithm=settings.JWT_ALGORITHM,
-    )
+    import jwt  # with its crypto backends, imported only when tokens are used
+
+    keys = get_jwt_keys()
+    with observe("jwt_encode"):
+        return jwt.encode(  # pyright: ignore[reportUnknownMemberType]
+            payload=token.model_dump(),
+            key=keys.signing_key,
+            algorithm=keys.algorithm,
+            headers={"kid": keys.kid},
+        )
 
 
 def decode_token(token_str: str) -> Token:
@@ -66,12 +229,17 @@ def decode_token(token_str: str) -> Token:
     Returns:
         Token: The decoded JWT token.
     """
+    import jwt
+
     try:
-        payload: str = jwt.decode(  # pyright: ignore[reportUnknownMemberType]
-            jwt=token_str,
-            key=settings.JWT_SECRET.get_secret_value(),
-            algorithms=[settings.JWT_ALGORITHM],
-        )
+        keys = get_jwt_keys()
+        with observe("jwt_decode"):
+            kid = jwt.get_unverified_header(token_str).get("kid")
+            payload: str = jwt.decode(  # pyright: ignore[reportUnknownMemberType]
+                jwt=token_str,
+                key=keys.get_verification_key(kid),
+                algorithms=[keys.algorithm],
+            )
         return Token.model_validate(payload)
 
     except jwt.ExpiredSignatureError as e:
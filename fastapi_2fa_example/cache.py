@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from typing import Any, cast
+
+from redis.exceptions import RedisError
+
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.redis import Redis, RedisAsyncConnectionPool
+
+
+class SingleFlight[K: Hashable, V]:
+    """
+    Deduplicate concurrent loads of the same key.
+
+    The first caller runs the loader, concurrent callers with the same key wait for
+    its result instead of running the loader again (e.g. to avoid a cache stampede
+    when many requests miss on the same key at once).
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        while (call := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+                # the leader was cancelled: retry, possibly becoming the leader
+
+        future: asyncio.Future[V] = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark as retrieved, the leader re-raises it
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+class TwoTierCache:
+    """
+    Small in-process LRU cache in front of Redis.
+
+    Local entries are only served while a dedicated connection receives RESP3
+    `CLIENT TRACKING` invalidation pushes (broadcast mode, for the configured key
+    prefixes): any write to a tracked key, from any client, evicts it locally.
+    If the tracking connection is lost, the local cache is flushed and bypassed
+    until tracking is re-established, so stale entries are never served.
+    """
+
+    def __init__(
+        self,
+        prefixes: Sequence[str],
+        max_size: int,
+        ttl_seconds: float,
+        ping_interval_seconds: float = 10,
+    ):
+        self.prefixes = tuple(prefixes)
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.ping_interval_seconds = ping_interval_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        # keys being fetched from Redis: an invalidation drops the marker, so a value
+        # read before a concurrent write is never stored locally
+        self._pending: dict[str, object] = {}
+        self._tracking = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def is_tracking(self) -> bool:
+        return self._tracking.is_set()
+
+    async def get(self, redis: Redis, key: str) -> str | None:
+        """Get a key from the local cache, falling back to Redis."""
+
+        tracking = self.is_tracking and self.max_size > 0
+        if tracking:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        self.misses += 1
+
+        if not tracking:
+            return cast(str | None, await redis.get(key))
+
+        marker = self._pending[key] = object()
+        try:
+            fetched = cast(str | None, await redis.get(key))
+            if fetched is not None and self._pending.get(key) is marker:
+                self._set_local(key, fetched)
+            return fetched
+        finally:
+            if self._pending.get(key) is marker:
+                del self._pending[key]
+
+    def _set_local(self, key: str, value: str) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_local(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+            self._pending.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._pending.clear()
+
+    async def _on_invalidation(self, response: list[Any]) -> None:
+        keys: list[str] | None = response[1]
+        if keys is None:  # FLUSHDB / FLUSHALL
+            self.clear()
+        else:
+            self.invalidate_local(*keys)
+
+    async def start(self, redis_pool: RedisAsyncConnectionPool) -> None:
+        """Start listening for invalidations and wait until tracking is enabled."""
+
+        self._task = asyncio.create_task(self._listen(redis_pool))
+        try:
+            await asyncio.wait_for(self._tracking.wait(), timeout=5)
+        except TimeoutError:  # pragma: no cover
+            logger.warning("Client tracking not enabled yet, local cache bypassed")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _listen(self, redis_pool: RedisAsyncConnectionPool) -> None:
+        retry_delay = 1.0
+        tracking_args: list[str] = ["CLIENT", "TRACKING", "ON", "BCAST"]
+        for prefix in self.prefixes:
+            tracking_args += ["PREFIX", prefix]
+
+        while True:
+            # dedicated connection, it does not take a slot of the pool
+            connection = redis_pool.make_connection()  # type: ignore[no-untyped-call]
+            try:
+                await connection.connect()
+                connection._parser.set_invalidation_push_handler(self._on_invalidation)
+                await connection.send_command(*tracking_args)
+                await connection.read_response()
+                self._tracking.set()
+                retry_delay = 1.0
+                logger.info(f"Client tracking enabled for prefixes {self.prefixes}")
+
+                while True:
+                    # read_response returns None on timeout: ping to detect dead peers
+                    response = await connection.read_response(
+                        push_request=True, timeout=self.ping_interval_seconds
+                    )
+                    if response is None:
+                        await connection.send_command("PING")
+                        await connection.read_response()
+            except (RedisError, OSError) as e:  # pragma: no cover
+                logger.warning(f"Client tracking connection lost: {e}")
+            finally:
+                self._tracking.clear()
+                self.clear()
+                await connection.disconnect()
+
+            await asyncio.sleep(retry_delay)  # pragma: no cover
+            retry_delay = min(retry_delay * 2, 30)  # pragma: no cover
+
+
+# Only users are cached locally. OTP keys are read at most a few times, right
+# after being written, and their checks (attempt counters, consume) must run in
+# Redis to stay atomic: local entries would always miss, and tracking them would
+# only add invalidation traffic on every attempt.
+local_cache = TwoTierCache(
+    prefixes=["user:"],
+    max_size=settings.LOCAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.LOCAL_CACHE_TTL_SECONDS,
+)
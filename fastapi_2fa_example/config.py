@@ -28,6 +28,21 @@ env_file = ".env.testing" if env == Environment.testing else ".env"
 class Settings(BaseSettings):
     ENV: Environment = Environment.development
 
+    # Server (python -m fastapi_2fa_example.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int | None = None  # defaults to the number of CPU cores
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "uvloop"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "httptools"
+    SERVER_MAX_REQUESTS: int | None = (
+        None  # requests served before a worker is gracefully replaced
+    )
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    SERVER_KEEP_ALIVE_SECONDS: int = 5
+    SERVER_FORWARDED_ALLOW_IPS: str = (
+        "127.0.0.1"  # comma-separated proxies trusted for X-Forwarded-For, or "*"
+    )
+
     # Logging
     LOG_LEVEL: LogLevel = LogLevel.DEBUG
     DEBUG: bool = True
@@ -40,6 +55,9 @@ class Settings(BaseSettings):
     POSTGRES_DATABASE: str = "postgres"
     POSTGRES_POOL_SIZE: int = 5
     POSTGRES_POOL_OVERFLOW_SIZE: int = 5
+    POSTGRES_POOL_BUDGET: int = (
+        50  # connections of all the server workers together, caps the pool sizes
+    )
     POSTGRES_POOL_ENABLED: bool = True
     POSTGRES_SYNC_POOL_SIZE: int = 1  # Specific pool size for sync connection
     POSTGRES_POOL_RECYCLE_SECONDS: int = 600  # 10 minutes
@@ -47,13 +65,39 @@ class Settings(BaseSettings):
         30  # how long to wait before failing to get a new connection
     )
     POSTGRES_LOG_LEVEL: LogLevel = LogLevel.WARNING
+    POSTGRES_STREAM_CHUNK_SIZE: int = 1000  # rows fetched per round trip when streaming
 
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_POOL_MAX_CONNECTIONS: int = 200
+    REDIS_POOL_BUDGET: int = (
+        400  # connections of all the server workers together, caps the pool size
+    )
     REDIS_WAIT_FOR_CONNECTION_TIMEOUT: int = 2  # seconds
 
+    # Warm-up (at startup, /readyz reports ready once it is done)
+    WARMUP_ENABLED: bool = True
+    WARMUP_POSTGRES_CONNECTIONS: int = 5  # capped at the pool size
+    WARMUP_REDIS_CONNECTIONS: int = 5  # capped at the pool max connections
+
+    # Outbound HTTP client
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 30
+    HTTP_CLIENT_TIMEOUT_SECONDS: float = 10  # read and write timeout
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS: float = 5
+    HTTP_CLIENT_POOL_TIMEOUT_SECONDS: float = (
+        5  # how long to wait for a free connection
+    )
+
+    # Cache
+    USER_CACHE_TTL_SECONDS: int = 300
+    LOCAL_CACHE_ENABLED: bool = True  # in-process cache invalidated by Redis tracking
+    LOCAL_CACHE_MAX_SIZE: int = 10_000
+    LOCAL_CACHE_TTL_SECONDS: int = 60
+
     # CORS
     CORS_ALLOWED_ORIGINS: list[str] = ["*"]
     CORS_ALLOWED_METHODS: list[str] = ["*"]
@@ -62,15 +106,78 @@ class Settings(BaseSettings):
 
     # Security
     JWT_SECRET: SecretStr = Field(default=SecretStr("changeme"))
-    JWT_ALGORITHM: str = "HS256"
+    JWT_ALGORITHM: str = "HS256"  # HS256, RS256 or EdDSA
+    JWT_PRIVATE_KEY: SecretStr | None = None  # PEM key, required by RS256 and EdDSA
+    JWT_KEY_ID: str = "default"  # "kid" header of the tokens signed by this service
+    JWT_PUBLIC_KEYS: dict[str, str] = {}  # kid -> PEM of rotated keys still accepted
+    JWKS_CACHE_MAX_AGE_SECONDS: int = 3600
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     LOGIN_TOKEN_EXPIRE_MINUTES: int = 10
     OTP_EXPIRE_MINUTES: int = 5
+    OTP_MAX_ATTEMPTS: int = 5  # wrong OTPs allowed per OTP and per login token
+    OTP_MAX_ATTEMPTS_PER_USER: int = 10  # wrong OTPs allowed per user, across logins
+    OTP_USER_ATTEMPTS_WINDOW_MINUTES: int = 15  # the per-user count expires after
+    TOKEN_CACHE_MAX_SIZE: int = 10_000  # decoded tokens kept in memory, 0 disables
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    ADMIN_API_KEY: SecretStr | None = None  # admin endpoints are disabled if not set
+
+    # Password hashing
+    PASSWORD_HASH_SCHEMES: list[str] = [
+        "sha256_crypt"
+    ]  # the first scheme is used for new hashes, the others are upgraded on login
+    PASSWORD_HASH_ROUNDS: int | None = None  # None keeps the scheme default cost
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "process"
+    PASSWORD_HASH_WORKERS: int | None = (
+        None  # defaults to the CPU cores divided among the server workers
+    )
+    PASSWORD_HASH_MAX_PENDING: int = (
+        64  # how many hashing jobs can be queued or running before rejecting
+    )
+
+    # Rate limiting (login, register and 2FA verification)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_IP_PER_MINUTE: int = 30  # requests per minute per client IP and route
+    RATE_LIMIT_EMAIL_PER_MINUTE: int = 10  # requests per minute per email and route
+
+    # Health checks (/readyz is served from the last background check)
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5  # how often Postgres and Redis are checked
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2  # a slower check marks the dependency down
+
+    # Metrics
+    METRICS_ENABLED: bool = True  # record request latencies, served at /metrics
+
+    # Tracing
+    TRACING_ENABLED: bool = False
+    TRACING_SERVICE_NAME: str = "fastapi-2fa-example"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SAMPLE_RATIO: float = Field(
+        default=0.1, ge=0, le=1
+    )  # ratio of the traces started here that are recorded
+
+    # Bulk import
+    BULK_IMPORT_BATCH_SIZE: int = 5000  # users loaded per COPY batch and commit
 
     # Email
     ENABLE_SENDGRID: bool = False
     SENDGRID_API_KEY: SecretStr = Field(default=SecretStr("mysecretapikey"))
     EMAIL_FROM: str = "noreply@example.com"
+    SENDGRID_MOCK: bool = False  # answer SendGrid calls locally (benchmarks, demos)
+    SENDGRID_BATCH_WINDOW_SECONDS: float = 0.05  # emails sent together are batched
+    SENDGRID_BATCH_MAX_SIZE: int = 1000  # SendGrid personalizations limit
+    MAIL_QUEUE_ENABLED: bool = False  # enqueue emails for the mail worker
+    MAIL_QUEUE_STREAM: str = "mail"
+    MAIL_QUEUE_DEAD_LETTER_STREAM: str = "mail:dead"
+    MAIL_QUEUE_MAX_LENGTH: int = 100_000  # approximate, oldest emails are trimmed
+    MAIL_QUEUE_DEAD_LETTER_MAX_LENGTH: int = 10_000  # approximate, oldest trimmed
+    MAIL_WORKER_CONSUMER: str | None = (
+        None  # name in the consumer group, defaults to the hostname
+    )
+    MAIL_WORKER_BATCH_SIZE: int = 1000  # emails read and sent together
+    MAIL_WORKER_MAX_RETRIES: int = 5
+    MAIL_WORKER_RETRY_BACKOFF_SECONDS: float = 1.0  # doubled at every retry
+    MAIL_WORKER_CLAIM_IDLE_SECONDS: int = (
+        300  # emails pending for longer are reclaimed from crashed workers
+    )
 
     model_config = SettingsConfigDict(
         env_file_encoding="utf-8",
@@ -94,6 +201,27 @@ class Settings(BaseSettings):
             )
         )
 
+    def get_worker_count(self) -> int:
+        """Number of server worker processes sharing the pool budgets."""
+        return self.SERVER_WORKERS or 1
+
+    def get_postgres_pool_sizes(self) -> tuple[int, int]:
+        """Pool size and max overflow of a worker, within POSTGRES_POOL_BUDGET."""
+        per_worker = max(1, self.POSTGRES_POOL_BUDGET // self.get_worker_count())
+        pool_size = min(self.POSTGRES_POOL_SIZE, per_worker)
+        return pool_size, min(self.POSTGRES_POOL_OVERFLOW_SIZE, per_worker - pool_size)
+
+    def get_redis_max_connections(self) -> int:
+        """Redis pool size of a worker, within REDIS_POOL_BUDGET."""
+        per_worker = max(1, self.REDIS_POOL_BUDGET // self.get_worker_count())
+        return min(self.REDIS_POOL_MAX_CONNECTIONS, per_worker)
+
+    def get_password_hash_workers(self) -> int:
+        """Hashing workers of a server worker: the cores are shared between them."""
+        if self.PASSWORD_HASH_WORKERS is not None:
+            return self.PASSWORD_HASH_WORKERS
+        return max(1, (os.process_cpu_count() or 1) // self.get_worker_count())
+
     def is_testing(self) -> bool:
         return self.ENV == Environment.testing
 
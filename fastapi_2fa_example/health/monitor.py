@@ -0,0 +1,146 @@
+"""
+Background health checks of the dependencies.
+
+/readyz is answered from the status cached by `HealthMonitor`, which checks
+Postgres and Redis every HEALTH_CHECK_INTERVAL_SECONDS on connections of its own:
+probes cost nothing on the application pools, and a saturated pool is not
+reported as a failed dependency.
+"""
+
+import asyncio
+import contextlib
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, cast
+
+from fastapi import Request
+from sqlalchemy import select
+
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.postgres import AsyncEngine
+from fastapi_2fa_example.redis import Redis
+
+STALE_AFTER_INTERVALS = 3  # a status older than this many intervals is not trusted
+
+
+@dataclass(frozen=True)
+class DependencyStatus:
+    healthy: bool
+    latency_ms: float | None = None
+    error: str | None = None
+    checked_at: float | None = None  # time.monotonic() of the check
+
+    def report(self, now: float) -> dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "latency_ms": self.latency_ms,
+            "error": self.error,
+            "age_seconds": None if self.checked_at is None else now - self.checked_at,
+        }
+
+
+NOT_CHECKED = DependencyStatus(healthy=False, error="not checked yet")
+
+
+async def timed_check(
+    check: Callable[[], Awaitable[object]], timeout_seconds: float
+) -> DependencyStatus:
+    """Run a health check and measure its latency.
+
+    Args:
+        check (Callable[[], Awaitable[object]]): The check, failing by raising.
+        timeout_seconds (float): The time after which the check fails.
+
+    Returns:
+        DependencyStatus: The status of the dependency.
+    """
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout_seconds):
+            await check()
+        error = None
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    return DependencyStatus(
+        healthy=error is None,
+        latency_ms=(time.perf_counter() - start) * 1000,
+        error=error,
+        checked_at=time.monotonic(),
+    )
+
+
+class HealthMonitor:
+    """Check Postgres and Redis periodically and cache the result."""
+
+    def __init__(
+        self,
+        interval_seconds: float = settings.HEALTH_CHECK_INTERVAL_SECONDS,
+        timeout_seconds: float = settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.postgres = NOT_CHECKED
+        self.redis = NOT_CHECKED
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def healthy(self) -> bool:
+        """Whether both dependencies were healthy at their last, recent, check."""
+
+        stale_before = time.monotonic() - self.interval_seconds * STALE_AFTER_INTERVALS
+        return all(
+            status.healthy
+            and status.checked_at is not None
+            and status.checked_at >= stale_before
+            for status in (self.postgres, self.redis)
+        )
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        now = time.monotonic()
+        return {"postgres": self.postgres.report(now), "redis": self.redis.report(now)}
+
+    async def check(self, engine: AsyncEngine, redis: Redis) -> None:
+        """Check both dependencies now and cache their status."""
+
+        async def ping_postgres() -> None:
+            async with engine.connect() as connection:
+                await connection.execute(select(1))
+
+        postgres, redis_status = await asyncio.gather(
+            timed_check(ping_postgres, self.timeout_seconds),
+            timed_check(redis.ping, self.timeout_seconds),
+        )
+        for name, previous, status in (
+            ("Postgres", self.postgres, postgres),
+            ("Redis", self.redis, redis_status),
+        ):
+            if previous.healthy and not status.healthy:
+                logger.error(f"{name} health check failed: {status.error}")
+            elif (
+                not previous.healthy and status.healthy and previous is not NOT_CHECKED
+            ):
+                logger.info(f"{name} health check recovered")
+        self.postgres, self.redis = postgres, redis_status
+
+    def start(self, engine: AsyncEngine, redis: Redis) -> None:
+        """Start checking the dependencies in the background."""
+
+        self._task = asyncio.create_task(self._run(engine, redis))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self, engine: AsyncEngine, redis: Redis) -> None:
+        while True:
+            await self.check(engine, redis)
+            await asyncio.sleep(self.interval_seconds)
+
+
+async def get_health_monitor(request: Request) -> HealthMonitor:  # pragma: no cover
+    return cast(HealthMonitor, request.state.health_monitor)
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
+from fastapi_2fa_example.health.monitor import HealthMonitor, get_health_monitor
 from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.metrics import get_registry
 from fastapi_2fa_example.postgres import AsyncSession, get_db_session
 from fastapi_2fa_example.redis import (
     RedisAsyncConnectionPool,
     get_redis_client_from_pool,
     get_redis_pool,
 )
+from fastapi_2fa_example.warmup import Readiness, get_readiness
 
 router = APIRouter(tags=["health"])
 
@@ -41,3 +47,50 @@ async def healthz(
         raise HTTPException(status_code=503, detail="Redis is not available") from e
 
     return {"status": "ok"}
+
+
+@router.get(
+    "/livez",
+    summary="Liveness check",
+    description="Check that the application is running, without touching any backend.",
+)
+async def livez() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@router.get(
+    "/readyz",
+    summary="Readiness check",
+    description=(
+        "Check that the application has warmed up and that the database and Redis "
+        "were reachable at the last background health check (with their latency)."
+    ),
+    responses={
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Service Unavailable"}
+    },
+)
+async def readyz(
+    response: Response,
+    readiness: Readiness = Depends(get_readiness),
+    health_monitor: HealthMonitor = Depends(get_health_monitor),
+) -> dict[str, Any]:
+    ready = readiness.warmed_up and health_monitor.healthy
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ok" if ready else "unavailable",
+        "warmed_up": readiness.warmed_up,
+        **health_monitor.report(),
+    }
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="Expose the application metrics in the Prometheus text format.",
+    include_in_schema=False,
+)
+async def metrics() -> Response:
+    return Response(
+        content=generate_latest(get_registry()), media_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,43 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import cast
+
+import httpx
+from fastapi import Request
+
+from fastapi_2fa_example.config import settings
+
+
+@asynccontextmanager
+async def create_http_client(
+    mounts: dict[str, httpx.AsyncBaseTransport] | None = None,
+) -> AsyncGenerator[httpx.AsyncClient]:
+    """Create the HTTP client shared by the outbound calls of a process.
+
+    Connections are kept alive and reused (HTTP/2 multiplexes concurrent requests
+    on a single connection), so only the first request to a host pays the DNS,
+    TCP and TLS setup.
+
+    Args:
+        mounts (dict[str, httpx.AsyncBaseTransport] | None): Transports by URL
+            prefix, e.g. mock transports in tests and benchmarks.
+    """
+    async with httpx.AsyncClient(
+        http2=settings.HTTP_CLIENT_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            settings.HTTP_CLIENT_TIMEOUT_SECONDS,
+            connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+            pool=settings.HTTP_CLIENT_POOL_TIMEOUT_SECONDS,
+        ),
+        mounts=mounts,
+    ) as client:
+        yield client
+
+
+async def get_http_client(request: Request) -> httpx.AsyncClient:  # pragma: no cover
+    return cast(httpx.AsyncClient, request.state.http_client)
@@ -0,0 +1,131 @@
+"""
+Import-time profile of the application modules.
+
+Imports each module in a fresh interpreter with `python -X importtime` and
+reports the cold start time, the total import time, the slowest top-level
+packages (self time) and the slowest modules (cumulative time).
+
+Usage:
+    python -m fastapi_2fa_example.importtime
+    python -m fastapi_2fa_example.importtime fastapi_2fa_example.users.bulk_import --top 10
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+@dataclass(frozen=True)
+class ImportProfile:
+    module: str
+    cold_start_seconds: float  # interpreter start and import, as a process sees it
+    records: list[ImportRecord]
+
+    @property
+    def total_ms(self) -> float:
+        return sum(record.self_us for record in self.records) / 1000
+
+    @property
+    def modules(self) -> set[str]:
+        return {record.module for record in self.records}
+
+    def by_package(self) -> list[tuple[str, float]]:
+        """Self import time in ms per top-level package, slowest first."""
+
+        packages: Counter[str] = Counter()
+        for record in self.records:
+            packages[record.module.partition(".")[0]] += record.self_us
+        return [(package, us / 1000) for package, us in packages.most_common()]
+
+    def report(self, top: int = 15) -> str:
+        lines = [
+            f"{self.module}: cold start {self.cold_start_seconds * 1000:.0f} ms, "
+            f"imports {self.total_ms:.0f} ms ({len(self.records)} modules)",
+            f"{'package':<40}{'self (ms)':>12}",
+        ]
+        lines += [
+            f"{package:<40}{ms:>12.1f}" for package, ms in self.by_package()[:top]
+        ]
+        lines.append(f"{'module':<60}{'cumulative (ms)':>16}")
+        slowest = sorted(self.records, key=lambda r: r.cumulative_us, reverse=True)
+        lines += [
+            f"{record.module:<60}{record.cumulative_us / 1000:>16.1f}"
+            for record in slowest[:top]
+        ]
+        return "\n".join(lines)
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """Parse the `-X importtime` lines of a process stderr."""
+
+    records = []
+    for line in output.splitlines():
+        if match := IMPORT_TIME_LINE.match(line):
+            records.append(
+                ImportRecord(
+                    module=match[4],
+                    self_us=int(match[1]),
+                    cumulative_us=int(match[2]),
+                )
+            )
+    return records
+
+
+def profile_import(module: str) -> ImportProfile:
+    """Import `module` in a new interpreter and profile the imports.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        ImportProfile: The import profile.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cold_start = time.perf_counter() - start
+    return ImportProfile(
+        module=module,
+        cold_start_seconds=cold_start,
+        records=parse_importtime(process.stderr),
+    )
+
+
+def main(argv: list[str] | None = None) -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        description="Report the import time of the application modules."
+    )
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=["fastapi_2fa_example.main"],
+        help="Modules to profile (default: fastapi_2fa_example.main)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="Packages and modules listed"
+    )
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        sys.stdout.write(profile_import(module).report(top=args.top) + "\n\n")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
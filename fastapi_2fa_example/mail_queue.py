@@ -0,0 +1,248 @@
+"""
+Durable outbound email queue backed by a Redis Stream.
+
+The API enqueues emails with `mail_queue.enqueue` and returns immediately; one or
+more worker processes read them with a consumer group, send them over a
+persistent HTTP client and acknowledge them. Emails that still fail after
+MAIL_WORKER_MAX_RETRIES retries are recorded in the dead-letter stream, without
+their body. Emails left pending by a crashed worker are reclaimed by the other
+workers.
+
+Each worker reads as a consumer named MAIL_WORKER_CONSUMER (the hostname by
+default), so a restarted worker resumes as the same consumer. On shutdown, the
+consumer is removed from the group once it has no pending emails.
+
+Usage:
+    python -m fastapi_2fa_example.mail_queue
+"""
+
+import asyncio
+import contextlib
+import signal
+import socket
+from collections.abc import Sequence
+from typing import cast
+
+import httpx
+from redis.exceptions import RedisError, ResponseError
+
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.http_client import create_http_client
+from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.mail_sender import EmailMessage, send_email, sendgrid_mounts
+from fastapi_2fa_example.redis import Redis, create_redis_pool
+
+CONSUMER_GROUP = "mail-workers"
+BLOCK_MILLISECONDS = 2000  # must stay below the Redis socket timeout
+
+type StreamMessage = tuple[str, dict[str, str]]
+
+
+class MailQueue:
+    def __init__(self, stream: str, max_length: int) -> None:
+        self.stream = stream
+        self.max_length = max_length
+
+    async def enqueue(self, redis: Redis, message: EmailMessage) -> str:
+        """Add an email to the queue.
+
+        Args:
+            redis (Redis): The Redis client.
+            message (EmailMessage): The email to send.
+
+        Returns:
+            str: The ID of the stream entry.
+        """
+        return cast(
+            str,
+            await redis.xadd(
+                self.stream,
+                message.model_dump(),  # type: ignore[arg-type]
+                maxlen=self.max_length,
+                approximate=True,
+            ),
+        )
+
+
+mail_queue = MailQueue(
+    stream=settings.MAIL_QUEUE_STREAM, max_length=settings.MAIL_QUEUE_MAX_LENGTH
+)
+
+
+class MailWorker:
+    """
+    Consume the mail queue, a batch of emails at a time.
+
+    The emails of a batch are sent concurrently, so `send_email` ships them in
+    multi-personalization SendGrid requests.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        client: httpx.AsyncClient,
+        consumer: str,
+        queue: MailQueue = mail_queue,
+    ) -> None:
+        self.redis = redis
+        self.client = client
+        self.consumer = consumer
+        self.stream = queue.stream
+        self.dead_letter_stream = settings.MAIL_QUEUE_DEAD_LETTER_STREAM
+        self.dead_letter_max_length = settings.MAIL_QUEUE_DEAD_LETTER_MAX_LENGTH
+        self.batch_size = settings.MAIL_WORKER_BATCH_SIZE
+
+    async def ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(
+                self.stream, CONSUMER_GROUP, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):  # pragma: no cover
+                raise
+
+    async def _read(self, block: int | None) -> list[StreamMessage]:
+        # messages left pending by a crashed worker come first
+        claimed = await self.redis.xautoclaim(
+            self.stream,
+            CONSUMER_GROUP,
+            self.consumer,
+            min_idle_time=settings.MAIL_WORKER_CLAIM_IDLE_SECONDS * 1000,
+            count=self.batch_size,
+        )
+        if claimed[1]:
+            # entries trimmed while pending are returned as (None, None) by Redis < 7
+            return [message for message in claimed[1] if message[0] is not None]
+
+        response = await self.redis.xreadgroup(
+            CONSUMER_GROUP,
+            self.consumer,
+            {self.stream: ">"},
+            count=self.batch_size,
+            block=block,
+        )
+        return [
+            message
+            for messages in response.get(self.stream, [])
+            for message in messages
+        ]
+
+    async def _deliver(self, message_id: str, fields: dict[str, str]) -> None:
+        message = EmailMessage.model_validate(fields)
+        retries = settings.MAIL_WORKER_MAX_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                await send_email(
+                    to_email=message.to_email,
+                    subject=message.subject,
+                    body=message.body,
+                    client=self.client,
+                )
+                return
+            except Exception as e:
+                if attempt == retries:
+                    logger.error(f"Email {message_id} moved to dead-letter: {e}")
+                    # only the metadata: the body contains the OTP code
+                    await self.redis.xadd(
+                        self.dead_letter_stream,
+                        {
+                            "message_id": message_id,
+                            "to_email": message.to_email,
+                            "subject": message.subject,
+                            "error": str(e),
+                            "attempts": attempt + 1,
+                        },
+                        maxlen=self.dead_letter_max_length,
+                        approximate=True,
+                    )
+                    return
+                delay = settings.MAIL_WORKER_RETRY_BACKOFF_SECONDS * 2**attempt
+                logger.warning(f"Email {message_id} failed, retry in {delay}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _ack(self, message_ids: Sequence[str]) -> None:
+        # emails contain OTP codes: delete them as soon as they are handled
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xack(self.stream, CONSUMER_GROUP, *message_ids)
+            pipe.xdel(self.stream, *message_ids)
+            await pipe.execute()
+
+    async def process_batch(self, block: int | None = BLOCK_MILLISECONDS) -> int:
+        """Read, send and acknowledge a batch of emails.
+
+        Args:
+            block (int | None): Milliseconds to wait for new emails, None to not wait.
+
+        Returns:
+            int: The number of messages handled.
+        """
+        messages = await self._read(block)
+        if not messages:
+            return 0
+
+        await asyncio.gather(
+            *(self._deliver(message_id, fields) for message_id, fields in messages)
+        )
+        await self._ack([message_id for message_id, _ in messages])
+        return len(messages)
+
+    async def leave_group(self) -> bool:
+        """Remove the consumer from the group, unless it still has pending emails.
+
+        Pending emails stay with the consumer, to be reclaimed by the other workers
+        or resumed by the next worker with the same name.
+
+        Returns:
+            bool: Whether the consumer was removed.
+        """
+        pending = await self.redis.xpending_range(
+            self.stream,
+            CONSUMER_GROUP,
+            min="-",
+            max="+",
+            count=1,
+            consumername=self.consumer,
+        )
+        if pending:
+            logger.warning(f"Mail worker {self.consumer} left with pending emails")
+            return False
+        await self.redis.xgroup_delconsumer(self.stream, CONSUMER_GROUP, self.consumer)
+        return True
+
+    async def run(self) -> None:  # pragma: no cover
+        await self.ensure_group()
+        logger.info(f"Mail worker {self.consumer} started")
+        try:
+            while True:
+                try:
+                    await self.process_batch()
+                except (RedisError, OSError) as e:
+                    logger.warning(f"Mail worker failed to read the queue: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            await self.leave_group()
+
+
+async def run_worker() -> None:  # pragma: no cover
+    consumer = settings.MAIL_WORKER_CONSUMER or socket.gethostname()
+    async with (
+        create_redis_pool(process_name="mail_worker") as redis_pool,
+        create_http_client(mounts=sendgrid_mounts()) as client,
+        Redis(connection_pool=redis_pool) as redis,
+    ):
+        worker = MailWorker(redis=redis, client=client, consumer=consumer)
+        task = asyncio.create_task(worker.run())
+        # stop gracefully on docker stop / Ctrl+C
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, task.cancel)
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+def main() -> None:  # pragma: no cover
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
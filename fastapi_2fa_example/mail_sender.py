@@ -1,3 +1,7 @@
+import asyncio
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 from typing import Any
 
 import httpx
@@ -5,6 +9,7 @@ from pydantic import BaseModel, Field
 
 from fastapi_2fa_example.config import settings
 from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.metrics import observe
 
 
 class SendGridEmail(BaseModel):
@@ -13,10 +18,159 @@ class SendGridEmail(BaseModel):
     content: list[dict[str, str]]
 
 
+class EmailMessage(BaseModel):
+    to_email: str
+    subject: str
+    body: str
+
+
+SENDGRID_URL = "https://api.sendgrid.com"
+
+
+def _mock_sendgrid_response(request: httpx.Request) -> httpx.Response:
+    if request.url.path != "/v3/mail/send":
+        return httpx.Response(404)
+    personalizations = json.loads(request.content).get("personalizations")
+    if not personalizations or len(personalizations) > 1000:
+        return httpx.Response(400)
+    return httpx.Response(202)
+
+
+def sendgrid_mock_transport() -> httpx.MockTransport:
+    """Transport answering SendGrid calls locally, like SendGrid would."""
+
+    return httpx.MockTransport(_mock_sendgrid_response)
+
+
+def sendgrid_mounts() -> dict[str, httpx.AsyncBaseTransport]:
+    """Transports of the shared HTTP client: when SENDGRID_MOCK is set, SendGrid
+    calls are answered locally by a mock transport."""
+
+    if not settings.SENDGRID_MOCK:
+        return {}
+    return {SENDGRID_URL: sendgrid_mock_transport()}
+
+
+# Per-recipient content: every personalization replaces the tag with its own body
+BODY_SUBSTITUTION_TAG = "-body-"
+
+
+async def _post_emails(
+    client: httpx.AsyncClient, messages: Sequence[EmailMessage]
+) -> None:
+    """Send emails with a single SendGrid request, one personalization each."""
+
+    email = SendGridEmail(
+        personalizations=[
+            {
+                "to": [{"email": message.to_email}],
+                "subject": message.subject,
+                "substitutions": {BODY_SUBSTITUTION_TAG: message.body},
+            }
+            for message in messages
+        ],
+        from_={"email": settings.EMAIL_FROM},
+        content=[{"type": "text/plain", "value": BODY_SUBSTITUTION_TAG}],
+    )
+
+    response = await client.post(
+        f"{SENDGRID_URL}/v3/mail/send",
+        headers={
+            "Authorization": f"Bearer {settings.SENDGRID_API_KEY.get_secret_value()}",
+            "Content-Type": "application/json",
+        },
+        json=email.model_dump(by_alias=True, mode="json"),
+    )
+    response.raise_for_status()
+
+
+@dataclass
+class _Batch:
+    emails: list[tuple[EmailMessage, asyncio.Future[None]]] = field(
+        default_factory=list
+    )
+    timer: asyncio.TimerHandle | None = None
+
+
+class EmailBatcher:
+    """
+    Micro-batch the emails sent within `window_seconds` with the same client into
+    a single multi-personalization SendGrid request (up to `max_batch_size`).
+
+    If a batch is rejected, its emails are sent one per request, so an invalid
+    email only fails its own sender.
+    """
+
+    def __init__(self, window_seconds: float, max_batch_size: int) -> None:
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._batches: dict[httpx.AsyncClient, _Batch] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def send(self, client: httpx.AsyncClient, message: EmailMessage) -> None:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(client)
+        if batch is None:
+            batch = self._batches[client] = _Batch()
+            batch.timer = loop.call_later(self.window_seconds, self._flush, client)
+
+        future: asyncio.Future[None] = loop.create_future()
+        batch.emails.append((message, future))
+        if len(batch.emails) >= self.max_batch_size:
+            self._flush(client)
+        await future
+
+    def _flush(self, client: httpx.AsyncClient) -> None:
+        batch = self._batches.pop(client, None)
+        if batch is None:  # pragma: no cover
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._send_batch(client, batch.emails))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(
+        self,
+        client: httpx.AsyncClient,
+        emails: list[tuple[EmailMessage, asyncio.Future[None]]],
+    ) -> None:
+        try:
+            await _post_emails(client, [message for message, _ in emails])
+            results: list[BaseException | None] = [None] * len(emails)
+        except Exception as e:
+            if len(emails) == 1:
+                results = [e]
+            else:
+                logger.warning(f"Batch of {len(emails)} emails failed, splitting: {e}")
+                results = await asyncio.gather(
+                    *(_post_emails(client, [message]) for message, _ in emails),
+                    return_exceptions=True,
+                )
+
+        for (_, future), result in zip(emails, results, strict=True):
+            if future.done():  # the sender was cancelled
+                continue
+            if result is None:
+                future.set_result(None)
+            else:
+                future.set_exception(result)
+
+
+email_batcher = EmailBatcher(
+    window_seconds=settings.SENDGRID_BATCH_WINDOW_SECONDS,
+    max_batch_size=settings.SENDGRID_BATCH_MAX_SIZE,
+)
+
+
 async def send_email(
-    to_email: str, subject: str, body: str
-) -> None:  # pragma: no cover
-    """Mock email sender function"""
+    to_email: str, subject: str, body: str, client: httpx.AsyncClient
+) -> None:
+    """Mock email sender function
+
+    The email is sent with the shared `client`, reusing its pooled connections,
+    batched with the other emails sent at the same time.
+    """
     logger.warning(
         f"Sending email to {to_email} with subject '{subject}' and body: {body}"
     )
@@ -29,27 +183,10 @@ async def send_email(
         logger.error("SendGrid is disabled. Email not sent.")
         return
 
-    email = SendGridEmail(
-        personalizations=[
-            {
-                "to": [{"email": to_email}],
-                "subject": subject,
-            }
-        ],
-        from_={"email": settings.EMAIL_FROM},
-        content=[{"type": "text/plain", "value": body}],
-    )
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.sendgrid.com/v3/mail/send",
-            headers={
-                "Authorization": f"Bearer {settings.SENDGRID_API_KEY.get_secret_value()}",
-                "Content-Type": "application/json",
-            },
-            json=email.model_dump(by_alias=True, mode="json"),
+    with observe("send_email"):
+        await email_batcher.send(
+            client, EmailMessage(to_email=to_email, subject=subject, body=body)
         )
-        response.raise_for_status()
 
     logger.info(f"Email sent to {to_email}")
     return
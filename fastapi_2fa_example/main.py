@@ -2,45 +2,102 @@ import contextlib
 from collections.abc import AsyncIterator
 from typing import TypedDict
 
+import httpx
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from fastapi_2fa_example.api import router
+from fastapi_2fa_example.auth.keys import get_jwt_keys
+from fastapi_2fa_example.auth.schemas import TokenType
+from fastapi_2fa_example.auth.utils import create_jwt_token, decode_token, hashing_pool
+from fastapi_2fa_example.cache import local_cache
 from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.health.monitor import HealthMonitor
 from fastapi_2fa_example.health.router import router as health_router
+from fastapi_2fa_example.http_client import create_http_client
 from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.mail_sender import sendgrid_mounts
+from fastapi_2fa_example.metrics import MetricsMiddleware
 from fastapi_2fa_example.postgres import (
     AsyncEngine,
     AsyncSessionMaker,
     create_async_engine,
     create_async_sessionmaker,
+    create_health_check_engine,
 )
-from fastapi_2fa_example.redis import RedisAsyncConnectionPool, create_redis_pool
+from fastapi_2fa_example.redis import (
+    RedisAsyncConnectionPool,
+    create_health_check_client,
+    create_redis_pool,
+)
+from fastapi_2fa_example.tracing import (
+    get_tracer_provider,
+    instrument_app,
+    instrument_engine,
+)
+from fastapi_2fa_example.warmup import Readiness
+from fastapi_2fa_example.well_known.router import router as well_known_router
 
 
 class State(TypedDict):
     async_engine: AsyncEngine
     async_sessionmaker: AsyncSessionMaker
     redis_pool: RedisAsyncConnectionPool
+    http_client: httpx.AsyncClient
+    readiness: Readiness
+    health_monitor: HealthMonitor
 
 
 @contextlib.asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[State]:  # pragma: no cover
     logger.info("Starting...")
 
-    async with create_redis_pool(process_name="app") as redis_pool:
+    # Parse the JWT keys once and sign and verify a token, failing fast on a
+    # misconfiguration (this also imports the lazily loaded JWT crypto backends)
+    get_jwt_keys()
+    decode_token(create_jwt_token(user_id=0, type=TokenType.ACCESS))
+
+    async with (
+        create_redis_pool(process_name="app") as redis_pool,
+        create_http_client(mounts=sendgrid_mounts()) as http_client,
+        create_health_check_client() as health_check_redis,
+    ):
         async_engine = create_async_engine(process_name="app", settings=settings)
         async_sessionmaker = create_async_sessionmaker(async_engine)
+        if settings.TRACING_ENABLED:
+            instrument_engine(async_engine, get_tracer_provider())
+        if settings.LOCAL_CACHE_ENABLED:
+            await local_cache.start(redis_pool)
+
+        readiness = Readiness()
+        if settings.WARMUP_ENABLED:
+            readiness.start(async_engine, redis_pool)
+        else:
+            readiness.warmed_up = True
+
+        health_check_engine = create_health_check_engine(settings)
+        health_monitor = HealthMonitor()
+        health_monitor.start(health_check_engine, health_check_redis)
 
         yield {
             "async_engine": async_engine,
             "async_sessionmaker": async_sessionmaker,
             "redis_pool": redis_pool,
+            "http_client": http_client,
+            "readiness": readiness,
+            "health_monitor": health_monitor,
         }
 
         logger.info("Shutting down...")
+        await health_monitor.stop()
+        await health_check_engine.dispose()
+        await readiness.stop()
+        await local_cache.stop()
         await async_engine.dispose()
+        hashing_pool.shutdown()
+        if settings.TRACING_ENABLED:
+            get_tracer_provider().shutdown()
 
 
 def create_app() -> FastAPI:
@@ -60,7 +117,7 @@ def create_app() -> FastAPI:
             "deepLinking": "true",
             "persistAuthorization": "true",
         },
-        default_response_class=JSONResponse,
+        default_response_class=ORJSONResponse,
     )
 
     app.add_middleware(
@@ -69,11 +126,22 @@ def create_app() -> FastAPI:
         allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
         allow_methods=settings.CORS_ALLOWED_METHODS,
         allow_headers=settings.CORS_ALLOWED_HEADERS,
+        # readable by browser clients, to fetch the next page of GET /users
+        expose_headers=["X-Next-Cursor"],
     )
 
-    # /healthz
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    if settings.TRACING_ENABLED:  # pragma: no cover
+        instrument_app(app, get_tracer_provider())
+
+    # /healthz, /livez, /readyz, /metrics
     app.include_router(health_router)
 
+    # /.well-known/jwks.json
+    app.include_router(well_known_router)
+
     app.include_router(router)
 
     return app
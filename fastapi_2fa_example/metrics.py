@@ -0,0 +1,165 @@
+import os
+import time
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.registry import Collector
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+if TYPE_CHECKING:
+    from redis.asyncio import ConnectionPool
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+OPERATION_DURATION = Histogram(
+    "operation_duration_seconds",
+    "Latency of hot-path operations (hashing, JWT, email)",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+OTP_ISSUED = Counter("otp_issued_total", "OTPs issued")
+OTP_VERIFIED = Counter("otp_verified_total", "OTPs verified successfully")
+OTP_FAILED = Counter(
+    "otp_failed_total", "OTP verifications failed, by reason", ["reason"]
+)
+TOKEN_CACHE_HITS = Counter("token_cache_hits_total", "Decoded JWT tokens cache hits")
+TOKEN_CACHE_MISSES = Counter(
+    "token_cache_misses_total", "Decoded JWT tokens cache misses"
+)
+
+
+@contextmanager
+def observe(operation: str) -> Iterator[None]:
+    """Measure the duration of an operation in `operation_duration_seconds`."""
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        OPERATION_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of every request by route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":  # pragma: no cover
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the route is set in the scope by the router, once matched
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool recording how long checkouts wait for a connection."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - start)
+
+
+class PoolCollector(Collector):
+    """Report the utilization of the tracked database and Redis pools."""
+
+    def __init__(self) -> None:
+        self._db_pools: weakref.WeakSet[QueuePool] = weakref.WeakSet()
+        self._redis_pools: weakref.WeakSet[ConnectionPool] = weakref.WeakSet()
+
+    def track_db_pool(self, pool: QueuePool) -> None:
+        self._db_pools.add(pool)
+
+    def track_redis_pool(self, pool: "ConnectionPool") -> None:
+        self._redis_pools.add(pool)
+
+    def collect(self) -> Iterator[Metric]:
+        db_in_use = GaugeMetricFamily(
+            "db_pool_connections_in_use", "Database connections checked out"
+        )
+        db_idle = GaugeMetricFamily(
+            "db_pool_connections_idle", "Database connections idle in the pool"
+        )
+        db_size = GaugeMetricFamily(
+            "db_pool_size", "Database pool size (without overflow)"
+        )
+        db_in_use.add_metric([], sum(pool.checkedout() for pool in self._db_pools))
+        db_idle.add_metric([], sum(pool.checkedin() for pool in self._db_pools))
+        db_size.add_metric([], sum(pool.size() for pool in self._db_pools))
+
+        redis_in_use = GaugeMetricFamily(
+            "redis_pool_connections_in_use", "Redis connections in use"
+        )
+        redis_idle = GaugeMetricFamily(
+            "redis_pool_connections_idle", "Redis connections idle in the pool"
+        )
+        redis_max = GaugeMetricFamily(
+            "redis_pool_max_connections", "Maximum number of Redis connections"
+        )
+        redis_in_use.add_metric(
+            [], sum(len(pool._in_use_connections) for pool in self._redis_pools)
+        )
+        redis_idle.add_metric(
+            [], sum(len(pool._available_connections) for pool in self._redis_pools)
+        )
+        redis_max.add_metric(
+            [], sum(pool.max_connections for pool in self._redis_pools)
+        )
+
+        yield from (db_in_use, db_idle, db_size, redis_in_use, redis_idle, redis_max)
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+
+
+def get_registry() -> CollectorRegistry:
+    """Registry of the metrics served at /metrics.
+
+    With several server workers (PROMETHEUS_MULTIPROC_DIR set), the histograms and
+    counters of every worker are aggregated; the pool gauges are the ones of the
+    worker serving the scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    registry.register(pool_collector)
+    return registry
@@ -1,16 +1,18 @@
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from typing import Literal
+from typing import Literal, cast
 
 from fastapi import Depends, Request
 from sqlalchemy import Engine, MetaData, exc
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine as _create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
 
 from .config import Settings
+from .metrics import InstrumentedAsyncAdaptedQueuePool, pool_collector
 
-type ProcessName = Literal["app", "test"]
+type ProcessName = Literal["app", "cli", "test"]
 type AsyncSessionMaker = async_sessionmaker[AsyncSession]
 
 
@@ -21,15 +23,35 @@ def create_async_sessionmaker(
 
 
 def create_async_engine(process_name: ProcessName, settings: Settings) -> AsyncEngine:
-    return _create_async_engine(
+    pool_size, max_overflow = settings.get_postgres_pool_sizes()
+    engine = _create_async_engine(
         url=str(settings.get_postgres_dsn("asyncpg")),
         connect_args={"server_settings": {"application_name": process_name}},
         echo=settings.DEBUG,
-        pool_size=settings.POSTGRES_POOL_SIZE,
-        max_overflow=settings.POSTGRES_POOL_OVERFLOW_SIZE,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
         pool_recycle=settings.POSTGRES_POOL_RECYCLE_SECONDS,
         pool_timeout=settings.POSTGRES_POOL_TIMEOUT,
     )
+    pool_collector.track_db_pool(cast(QueuePool, engine.pool))
+    return engine
+
+
+def create_health_check_engine(settings: Settings) -> AsyncEngine:
+    """Engine with a single connection of its own, used by the health monitor.
+
+    Health checks never wait for, nor take, a connection of the application pool:
+    a saturated pool is not reported as a database failure.
+    """
+    return _create_async_engine(
+        url=str(settings.get_postgres_dsn("asyncpg")),
+        connect_args={"server_settings": {"application_name": "health"}},
+        pool_size=1,
+        max_overflow=0,
+        pool_recycle=settings.POSTGRES_POOL_RECYCLE_SECONDS,
+        pool_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    )
 
 
 async def get_db_sessionmaker(
@@ -102,6 +124,7 @@ async def create_all(
 __all__ = [
     "AsyncSession",
     "create_async_engine",
+    "create_health_check_engine",
     "get_db_session",
     "get_db_session_from_pool",
     "DbPoolExhaustedException",
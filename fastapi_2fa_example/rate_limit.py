@@ -0,0 +1,128 @@
+import math
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import cast
+
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.redis import (
+    RedisAsyncConnectionPool,
+    RedisPoolExhaustedException,
+    get_redis_client_from_pool,
+)
+
+# GCRA (generic cell rate algorithm) over several keys at once: the request is
+# allowed only if every key allows it, and no key is updated otherwise.
+# Each key stores its "theoretical arrival time" (TAT) in milliseconds, using the
+# Redis clock so that every app instance agrees on the time.
+# ARGV[2 * i - 1], ARGV[2 * i]: emission interval and burst tolerance of KEYS[i].
+# Returns 0 if allowed, otherwise the number of milliseconds to wait.
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local new_tats = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local tolerance = tonumber(ARGV[2 * i])
+    local tat = math.max(tonumber(redis.call("GET", key) or now), now)
+    local allow_at = tat - tolerance
+    if allow_at > now then
+        retry_after = math.max(retry_after, allow_at - now)
+    end
+    new_tats[i] = tat + interval
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call("SET", key, new_tats[i], "PX", new_tats[i] - now)
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class Limit:
+    """At most `rate` requests per `period_seconds` for `key`, bursts included."""
+
+    key: str
+    rate: int
+    period_seconds: float = 60
+
+    @property
+    def interval_ms(self) -> int:
+        return math.ceil(self.period_seconds * 1000 / self.rate)
+
+    @property
+    def tolerance_ms(self) -> int:
+        return self.interval_ms * (self.rate - 1)
+
+
+class RateLimiter:
+    """
+    Distributed rate limiter, one Lua script call per request.
+
+    If Redis is unavailable the limits are enforced per process instead (fail
+    open: the global limit is not guaranteed, but requests are still served).
+    """
+
+    def __init__(self, local_max_size: int = 10_000) -> None:
+        self.local_max_size = local_max_size
+        self._script: AsyncScript | None = None
+        self._local_tats: dict[str, float] = {}
+
+    async def hit(
+        self, redis_pool: RedisAsyncConnectionPool, limits: Sequence[Limit]
+    ) -> float:
+        """Count a request against all the limits.
+
+        Args:
+            redis_pool (RedisAsyncConnectionPool): The Redis connection pool.
+            limits (Sequence[Limit]): The limits the request is subject to.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the seconds to wait.
+        """
+        try:
+            async with get_redis_client_from_pool(redis_pool) as redis:
+                if self._script is None:
+                    self._script = redis.register_script(GCRA_SCRIPT)
+                retry_after_ms = await self._script(
+                    keys=[f"rate_limit:{limit.key}" for limit in limits],
+                    args=[
+                        value
+                        for limit in limits
+                        for value in (limit.interval_ms, limit.tolerance_ms)
+                    ],
+                    client=redis,
+                )
+        except (RedisError, RedisPoolExhaustedException) as e:
+            logger.warning(f"Rate limiter unavailable, using local limits: {e}")
+            return self._hit_local(limits)
+        return cast(int, retry_after_ms) / 1000
+
+    def _hit_local(self, limits: Sequence[Limit]) -> float:
+        now = time.monotonic() * 1000
+        tats = [max(self._local_tats.get(limit.key, now), now) for limit in limits]
+        retry_after_ms = max(
+            tat - limit.tolerance_ms - now
+            for tat, limit in zip(tats, limits, strict=True)
+        )
+        if retry_after_ms > 0:
+            return retry_after_ms / 1000
+
+        if len(self._local_tats) >= self.local_max_size:
+            self._local_tats = {k: t for k, t in self._local_tats.items() if t > now}
+            if len(self._local_tats) >= self.local_max_size:
+                self._local_tats.clear()
+        for tat, limit in zip(tats, limits, strict=True):
+            self._local_tats[limit.key] = tat + limit.interval_ms
+        return 0
+
+
+rate_limiter = RateLimiter()
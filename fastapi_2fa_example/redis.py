@@ -6,6 +6,7 @@ from fastapi import Request
 from redis.asyncio import BlockingConnectionPool, ConnectionError, ConnectionPool, Redis
 
 from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.metrics import pool_collector
 
 type RedisAsyncConnectionPool = ConnectionPool
 
@@ -17,7 +18,7 @@ async def create_redis_pool(
     redis_pool = BlockingConnectionPool(
         host=settings.REDIS_HOST,
         port=settings.REDIS_PORT,
-        max_connections=settings.REDIS_POOL_MAX_CONNECTIONS,
+        max_connections=settings.get_redis_max_connections(),
         timeout=settings.REDIS_WAIT_FOR_CONNECTION_TIMEOUT,
         decode_responses=True,
         client_name=process_name,
@@ -26,10 +27,30 @@ async def create_redis_pool(
         socket_connect_timeout=5.0,
         health_check_interval=30,
     )
+    pool_collector.track_redis_pool(redis_pool)
     yield redis_pool
     await redis_pool.aclose()
 
 
+@asynccontextmanager
+async def create_health_check_client() -> AsyncGenerator[Redis]:
+    """Redis client with a single connection of its own, used by the health monitor.
+
+    Health checks never wait for, nor take, a connection of the application pool.
+    """
+    async with Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        decode_responses=True,
+        client_name="health",
+        protocol=3,
+        socket_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+        single_connection_client=True,
+    ) as client:
+        yield client
+
+
 async def get_redis_pool(
     request: Request,
 ) -> RedisAsyncConnectionPool:  # pragma: no cover
@@ -58,6 +79,7 @@ __all__ = [
     "RedisAsyncConnectionPool",
     "Redis",
     "create_redis_pool",
+    "create_health_check_client",
     "get_redis_pool",
     "RedisPoolExhaustedException",
     "get_redis_client_from_pool",
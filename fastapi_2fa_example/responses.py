@@ -0,0 +1,37 @@
+from collections.abc import Mapping
+from typing import Any
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+def json_response[T](
+    adapter: TypeAdapter[T],
+    content: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """
+    Serialize `content` straight to JSON bytes with pydantic-core.
+
+    `content` (ORM objects included) is validated with `adapter`, like a
+    `response_model` would, and dumped with `dump_json`: this skips FastAPI's
+    intermediate `jsonable_encoder` pass over Python objects, which dominates the
+    cost of large responses.
+
+    Args:
+        adapter (TypeAdapter[T]): The adapter of the response model.
+        content (Any): The response content.
+        status_code (int): The response status code.
+        headers (Mapping[str, str] | None): Additional response headers.
+
+    Returns:
+        Response: The JSON response.
+    """
+    value = adapter.validate_python(content, from_attributes=True)
+    return Response(
+        content=adapter.dump_json(value),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,62 @@
+"""
+Production server: uvicorn with one worker process per core.
+
+Each worker runs its own event loop, connection pools and password hashing pool,
+so the pool budgets (POSTGRES_POOL_BUDGET, REDIS_POOL_BUDGET) and the CPU cores
+are divided among the workers. Workers are gracefully replaced after
+SERVER_MAX_REQUESTS requests, when set. The client address (used by the rate
+limits) is read from X-Forwarded-For only behind the SERVER_FORWARDED_ALLOW_IPS
+proxies.
+
+Usage:
+    python -m fastapi_2fa_example.server
+"""
+
+import os
+import tempfile
+from typing import Any
+
+import uvicorn
+
+from fastapi_2fa_example.config import settings
+
+
+def get_server_options(workers: int) -> dict[str, Any]:
+    """Options of `uvicorn.run` for the production server.
+
+    Args:
+        workers (int): The number of worker processes.
+
+    Returns:
+        dict[str, Any]: The keyword arguments of `uvicorn.run`.
+    """
+    return {
+        "host": settings.SERVER_HOST,
+        "port": settings.SERVER_PORT,
+        "workers": workers,
+        "loop": settings.SERVER_LOOP,
+        "http": settings.SERVER_HTTP,
+        "limit_max_requests": settings.SERVER_MAX_REQUESTS,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        "timeout_keep_alive": settings.SERVER_KEEP_ALIVE_SECONDS,
+        "proxy_headers": True,
+        "forwarded_allow_ips": settings.SERVER_FORWARDED_ALLOW_IPS,
+    }
+
+
+def main() -> None:  # pragma: no cover
+    workers = settings.SERVER_WORKERS or os.process_cpu_count() or 1
+
+    # the workers read the settings from the environment: they size their pools
+    # from the number of workers and share their metrics through files
+    os.environ["SERVER_WORKERS"] = str(workers)
+    if workers > 1:
+        os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-")
+        )
+
+    uvicorn.run("fastapi_2fa_example.main:app", **get_server_options(workers))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
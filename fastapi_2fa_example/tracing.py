@@ -0,0 +1,86 @@
+"""
+Optional OpenTelemetry tracing.
+
+When TRACING_ENABLED is set, requests, SQLAlchemy queries and Redis commands are
+traced and exported over OTLP; the steps of the auth flows add their own spans
+with `tracer`. Without a configured tracer provider, spans are no-ops.
+"""
+
+import functools
+from typing import TYPE_CHECKING
+
+from opentelemetry import trace
+
+from fastapi_2fa_example.config import settings
+
+if TYPE_CHECKING:
+    # the SDK and the instrumentations are only imported when tracing is enabled
+    from fastapi import FastAPI
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SpanExporter
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+tracer = trace.get_tracer("fastapi_2fa_example")
+
+
+def create_tracer_provider(
+    exporter: "SpanExporter", sample_ratio: float = settings.TRACING_SAMPLE_RATIO
+) -> "TracerProvider":
+    """Create a tracer provider exporting the sampled spans in batches.
+
+    Args:
+        exporter (SpanExporter): The exporter spans are sent to.
+        sample_ratio (float): The ratio of traces recorded, from 0 to 1. The
+            sampling decision of the caller, if any, is always respected.
+
+    Returns:
+        TracerProvider: The tracer provider.
+    """
+    from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
+
+@functools.cache
+def get_tracer_provider() -> "TracerProvider":  # pragma: no cover
+    """The process tracer provider, exporting to TRACING_OTLP_ENDPOINT."""
+
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+        OTLPSpanExporter,
+    )
+
+    provider = create_tracer_provider(
+        OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    )
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def instrument_app(app: "FastAPI", provider: "TracerProvider") -> None:
+    """Trace the requests handled by `app` and every Redis command."""
+
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.instrumentation.redis import RedisInstrumentor
+
+    FastAPIInstrumentor.instrument_app(
+        app, tracer_provider=provider, excluded_urls="healthz,livez,readyz,metrics"
+    )
+    RedisInstrumentor().instrument(tracer_provider=provider)
+
+
+def instrument_engine(engine: "AsyncEngine", provider: "TracerProvider") -> None:
+    """Trace the queries run by `engine`."""
+
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+    SQLAlchemyInstrumentor().instrument(
+        engine=engine.sync_engine, tracer_provider=provider
+    )
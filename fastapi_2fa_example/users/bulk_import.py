@@ -0,0 +1,257 @@
+"""
+Bulk import of users from CSV or NDJSON files.
+
+Passwords are hashed in parallel in the password hashing pool and rows are loaded with the
+PostgreSQL COPY protocol into a staging table, then moved to `users` with a single
+INSERT ... ON CONFLICT (email) DO NOTHING per batch.
+
+Usage:
+    python -m fastapi_2fa_example.users.bulk_import users.csv [--batch-size 5000]
+
+CSV files must have a header with the columns: email, password, name, surname and
+(optionally) requires_2fa. NDJSON files must contain one object per line with the
+same keys.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from fastapi_2fa_example.auth.schemas import RegisterRequest
+from fastapi_2fa_example.auth.utils import (
+    PasswordHasher,
+    PasswordHashingPool,
+    hashing_pool,
+    password_hasher,
+)
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.postgres import (
+    AsyncSession,
+    create_async_engine,
+    create_async_sessionmaker,
+)
+
+from .schemas import BulkImportResult, InvalidImportRow
+
+type ImportFormat = Literal["csv", "ndjson"]
+
+STAGING_TABLE = "users_import"
+STAGING_COLUMNS = ["email", "password_hash", "name", "surname", "requires_2fa"]
+HASH_CHUNK_SIZE = 16  # passwords hashed per hashing pool job
+
+
+def parse_records(
+    lines: Iterable[str], format: ImportFormat
+) -> Iterator[tuple[int, dict[str, Any] | str]]:
+    """Yield (line number, record) pairs, or (line number, error) for invalid lines."""
+
+    if format == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # empty cells fall back to the schema defaults
+            yield reader.line_num, {k: v for k, v in record.items() if v}
+        return
+
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_num, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_num, "Invalid JSON: expected an object"
+            continue
+        yield line_num, record
+
+
+def hash_passwords(hasher: PasswordHasher, passwords: list[str]) -> list[str]:
+    """Hash a chunk of passwords (runs in a hashing pool worker)."""
+
+    return [hasher.hash(password) for password in passwords]
+
+
+async def _hash_batch(pool: PasswordHashingPool, passwords: list[str]) -> list[str]:
+    # one chunk per worker in flight: the rest of the pool queue stays available
+    # to the logins served by the same process
+    semaphore = asyncio.Semaphore(pool.max_workers)
+
+    async def hash_chunk(chunk: list[str]) -> list[str]:
+        async with semaphore:
+            return await pool.run(hash_passwords, password_hasher, chunk)
+
+    chunks = await asyncio.gather(
+        *(
+            hash_chunk(passwords[i : i + HASH_CHUNK_SIZE])
+            for i in range(0, len(passwords), HASH_CHUNK_SIZE)
+        )
+    )
+    return [password_hash for chunk in chunks for password_hash in chunk]
+
+
+async def _load_batch(
+    session: AsyncSession, pool: PasswordHashingPool, users: list[RegisterRequest]
+) -> set[str]:
+    """Load a batch of users, returning the emails actually inserted."""
+
+    password_hashes = await _hash_batch(
+        pool, [user.password.get_secret_value() for user in users]
+    )
+
+    # Pooled connections are reused across batches: the staging table lives as long
+    # as the connection and is emptied at every commit.
+    await session.execute(
+        text(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} ("
+            "email VARCHAR NOT NULL, password_hash VARCHAR NOT NULL, "
+            "name VARCHAR(50) NOT NULL, surname VARCHAR(50) NOT NULL, "
+            "requires_2fa BOOLEAN NOT NULL"
+            ") ON COMMIT DELETE ROWS"
+        )
+    )
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(  # type: ignore[union-attr]
+        STAGING_TABLE,
+        records=[
+            (user.email, password_hash, user.name, user.surname, user.requires_2fa)
+            for user, password_hash in zip(users, password_hashes, strict=True)
+        ],
+        columns=STAGING_COLUMNS,
+    )
+    result = await session.execute(
+        text(
+            "INSERT INTO users (email, password_hash, name, surname, requires_2fa, "
+            "created_at) "
+            "SELECT email, password_hash, name, surname, requires_2fa, now() "
+            f"FROM {STAGING_TABLE} "
+            "ON CONFLICT (email) DO NOTHING RETURNING email"
+        )
+    )
+    inserted = set(result.scalars())
+    await session.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+    await session.commit()
+    return inserted
+
+
+async def import_users(
+    session: AsyncSession,
+    lines: Iterable[str],
+    format: ImportFormat,
+    batch_size: int | None = None,
+    pool: PasswordHashingPool = hashing_pool,
+) -> BulkImportResult:
+    """
+    Import users in batches, skipping invalid rows and already registered emails.
+
+    Args:
+        session (AsyncSession): The database session (committed after every batch).
+        lines (Iterable[str]): The lines of the CSV or NDJSON file.
+        format (ImportFormat): The file format.
+        batch_size (int | None): Users per batch, defaults to settings.
+        pool (PasswordHashingPool): Pool used to hash passwords, the shared hashing
+            pool of the process by default.
+
+    Returns:
+        BulkImportResult: The number of inserted users and the rejected rows.
+
+    Raises:
+        HashingPoolExhaustedException: If the hashing pool queue is full. The
+            batches loaded before stay committed.
+    """
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    result = BulkImportResult()
+    seen_emails: set[str] = set()
+    batch: list[RegisterRequest] = []
+    processed = 0
+
+    async def flush() -> None:
+        inserted = await _load_batch(session, pool, batch)
+        result.inserted += len(inserted)
+        result.duplicates += [
+            user.email for user in batch if user.email not in inserted
+        ]
+        batch.clear()
+        logger.info(
+            f"Bulk import: {processed} rows processed, {result.inserted} inserted, "
+            f"{len(result.duplicates)} duplicates, {len(result.invalid)} invalid"
+        )
+
+    for line, record in parse_records(lines, format):
+        processed += 1
+        if isinstance(record, str):
+            result.invalid.append(InvalidImportRow(line=line, error=record))
+            continue
+        try:
+            user = RegisterRequest.model_validate(record)
+        except ValidationError as e:
+            error = "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            )
+            result.invalid.append(InvalidImportRow(line=line, error=error))
+            continue
+
+        if user.email in seen_emails:
+            result.duplicates.append(user.email)
+            continue
+        seen_emails.add(user.email)
+
+        batch.append(user)
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+
+    return result
+
+
+async def run(  # pragma: no cover
+    path: Path, format: ImportFormat, batch_size: int | None
+) -> BulkImportResult:
+    engine = create_async_engine(process_name="cli", settings=settings)
+    # the CLI has the machine to itself: one hashing worker per core
+    workers = settings.PASSWORD_HASH_WORKERS or os.process_cpu_count() or 1
+    pool = PasswordHashingPool(
+        executor_type="process", max_workers=workers, max_pending=workers
+    )
+    try:
+        async with create_async_sessionmaker(engine)() as session:
+            with path.open(newline="", encoding="utf-8") as f:
+                return await import_users(session, f, format, batch_size, pool=pool)
+    finally:
+        pool.shutdown()
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Bulk import users.")
+    parser.add_argument("path", type=Path, help="CSV or NDJSON file")
+    parser.add_argument(
+        "--format",
+        choices=["csv", "ndjson"],
+        help="file format (default: from the file extension)",
+    )
+    parser.add_argument("--batch-size", type=int, help="users per COPY batch")
+    args = parser.parse_args(argv)
+
+    format: ImportFormat = args.format or (
+        "csv" if args.path.suffix.lower() == ".csv" else "ndjson"
+    )
+    result = asyncio.run(run(args.path, format, args.batch_size))
+    sys.stdout.write(result.model_dump_json(indent=2) + "\n")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
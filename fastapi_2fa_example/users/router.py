@@ -1,33 +1,116 @@
-from collections.abc import Sequence
+from collections.abc import AsyncIterator
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
-from fastapi_2fa_example.auth.dependencies import validate_access_token
+from fastapi_2fa_example.auth.dependencies import (
+    validate_access_token,
+    validate_admin_key,
+)
 from fastapi_2fa_example.auth.schemas import Token
-from fastapi_2fa_example.models import User as UserModel
-from fastapi_2fa_example.postgres import AsyncSession, get_db_session
+from fastapi_2fa_example.auth.utils import HashingPoolExhaustedException
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.postgres import (
+    AsyncSession,
+    AsyncSessionMaker,
+    get_db_session,
+    get_db_sessionmaker,
+)
+from fastapi_2fa_example.redis import (
+    RedisAsyncConnectionPool,
+    get_redis_client_from_pool,
+    get_redis_pool,
+)
+from fastapi_2fa_example.responses import json_response
 
-from .schemas import User
-from .service import user_service
+from . import bulk_import
+from .schemas import BulkImportResult, User
+from .service import user_from_row, user_service
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
 )
 
+USER_ADAPTER = TypeAdapter(User)
+USERS_ADAPTER = TypeAdapter(list[User])
+
+IMPORT_FORMATS: dict[str, bulk_import.ImportFormat] = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+}
+
 
 @router.get(
     "",
     response_model=list[User],
     dependencies=[Depends(validate_access_token)],
     summary="Get all users",
-    description="Retrieve a list of all users in the system.",
+    description=(
+        "Retrieve a page of users ordered by ID. "
+        "When more users are available, the `X-Next-Cursor` response header contains "
+        "the cursor of the next page."
+    ),
     responses={status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"}},
 )
 async def get_users(
+    limit: int = Query(default=100, ge=1, le=1000, description="Page size"),
+    cursor: int | None = Query(
+        default=None, description="Cursor returned in the X-Next-Cursor header"
+    ),
     session: AsyncSession = Depends(get_db_session),
-) -> Sequence[UserModel]:
-    return await user_service.get_all(session=session)
+) -> Response:
+    users = await user_service.get_page(session=session, limit=limit, after_id=cursor)
+    headers = {"X-Next-Cursor": str(users[-1].id)} if len(users) == limit else None
+    # User instances are not revalidated by the adapter
+    return json_response(
+        USERS_ADAPTER, [user_from_row(user) for user in users], headers=headers
+    )
+
+
+@router.get(
+    "/stream",
+    dependencies=[Depends(validate_access_token)],
+    summary="Stream all users",
+    description=(
+        "Stream all users ordered by ID, as newline-delimited JSON (default) "
+        "or as a JSON array. Memory usage does not depend on the number of users."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"application/x-ndjson": {}, "application/json": {}}
+        },
+        status.HTTP_401_UNAUTHORIZED: {"description": "Unauthorized"},
+    },
+)
+async def stream_users(
+    format: Literal["ndjson", "json"] = Query(default="ndjson"),
+    sessionmaker: AsyncSessionMaker = Depends(get_db_sessionmaker),
+) -> StreamingResponse:
+    async def generate() -> AsyncIterator[str]:
+        # The request session is closed before the response is streamed:
+        # the stream uses its own session.
+        async with sessionmaker() as session:
+            first = True
+            if format == "json":
+                yield "["
+            async for users in user_service.stream_all(
+                session=session, chunk_size=settings.POSTGRES_STREAM_CHUNK_SIZE
+            ):
+                lines = [user_from_row(user).model_dump_json() for user in users]
+                if format == "json":
+                    yield ("" if first else ",") + ",".join(lines)
+                else:
+                    yield "".join(f"{line}\n" for line in lines)
+                first = False
+            if format == "json":
+                yield "]"
+
+    media_type = "application/json" if format == "json" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
 
 
 @router.get(
@@ -43,10 +126,61 @@ async def get_users(
 async def get_me(
     token: Token = Depends(validate_access_token),
     session: AsyncSession = Depends(get_db_session),
-) -> UserModel:
-    user = await user_service.get(session=session, user_id=token.user_id)
+    redis_pool: RedisAsyncConnectionPool = Depends(get_redis_pool),
+) -> Response:
+    async with get_redis_client_from_pool(redis_pool) as redis:
+        user = await user_service.get_cached(
+            session=session, redis=redis, user_id=token.user_id
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-    return user
+    return json_response(USER_ADAPTER, user)
+
+
+@router.post(
+    "/import",
+    response_model=BulkImportResult,
+    dependencies=[Depends(validate_admin_key)],
+    summary="Bulk import users",
+    description=(
+        "Create users from a CSV (`text/csv`) or NDJSON (`application/x-ndjson`) "
+        "body, requires the `X-Admin-Key` header. Rows with an already registered "
+        "email and invalid rows are skipped and reported."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/csv": {}, "application/x-ndjson": {}},
+        }
+    },
+    responses={
+        status.HTTP_403_FORBIDDEN: {"description": "Invalid admin key"},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {
+            "description": "Unsupported content type"
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Service Unavailable"},
+    },
+)
+async def import_users(
+    request: Request,
+    session: AsyncSession = Depends(get_db_session),
+) -> BulkImportResult:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    format = IMPORT_FORMATS.get(content_type.lower())
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type, expected one of {list(IMPORT_FORMATS)}",
+        )
+    body = await request.body()
+    try:
+        return await bulk_import.import_users(
+            session=session, lines=body.decode().splitlines(), format=format
+        )
+    except HashingPoolExhaustedException:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry later",
+        )
@@ -16,3 +16,18 @@ class UserCreate(UserBase):
 
 class User(UserBase):
     id: int
+
+
+class InvalidImportRow(BaseModel):
+    line: int = Field(..., description="Line number in the imported file")
+    error: str = Field(..., description="Validation error")
+
+
+class BulkImportResult(BaseModel):
+    inserted: int = Field(default=0, description="Number of users created")
+    duplicates: list[str] = Field(
+        default_factory=list, description="Emails rejected because already registered"
+    )
+    invalid: list[InvalidImportRow] = Field(
+        default_factory=list, description="Rows rejected because invalid"
+    )
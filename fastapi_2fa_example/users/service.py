@@ -1,21 +1,58 @@
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Sequence
 
-from sqlalchemy import select
+import orjson
+from redis.exceptions import RedisError
+from sqlalchemy import Row, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fastapi_2fa_example.cache import SingleFlight, TwoTierCache, local_cache
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.logger import logger
 from fastapi_2fa_example.models import User as UserModel
+from fastapi_2fa_example.redis import Redis
 
-from .schemas import UserCreate
+from .schemas import User, UserCreate
+
+# Columns needed by the User schema: read-only endpoints select only these columns
+# and get plain rows, skipping ORM hydration and the identity map.
+USER_COLUMNS = (
+    UserModel.id,
+    UserModel.email,
+    UserModel.name,
+    UserModel.surname,
+    UserModel.requires_2fa,
+)
+type UserRow = Row[tuple[int, str, str, str, bool]]
+
+
+def user_from_row(row: UserRow) -> User:
+    """Build the User of a row read from the database, without validating it.
+
+    Users are validated when they are created: revalidating every email read back
+    from the database or the cache would dominate the cost of the responses.
+    """
+    return User.model_construct(**row._mapping)
 
 
 class UserService:
+    def __init__(self, cache: TwoTierCache) -> None:
+        self._cache = cache
+        self._single_flight: SingleFlight[int, User | None] = SingleFlight()
+
+    @staticmethod
+    def _cache_key(user_id: int) -> str:
+        return f"user:{user_id}"
+
     async def get_by_email(self, session: AsyncSession, email: str) -> UserModel | None:
         result = await session.execute(
             select(UserModel).where(UserModel.email == email)
         )
         return result.scalars().first()
 
-    async def add(self, session: AsyncSession, user_create: UserCreate) -> UserModel:
+    async def add(
+        self, session: AsyncSession, user_create: UserCreate, redis: Redis | None = None
+    ) -> UserModel:
         user = UserModel(
             email=user_create.email,
             password_hash=user_create.password_hash,
@@ -26,14 +63,157 @@ class UserService:
         session.add(user)
         await session.commit()
         await session.refresh(user)
+        if redis is not None:
+            await self.invalidate(redis, user.id)
         return user
 
-    async def get_all(self, session: AsyncSession) -> Sequence[UserModel]:
-        result = await session.execute(select(UserModel))
-        return result.scalars().all()
+    async def add_if_not_exists(
+        self, session: AsyncSession, user_create: UserCreate, redis: Redis | None = None
+    ) -> UserRow | None:
+        """Insert a user unless the email is already registered.
+
+        A single INSERT ... ON CONFLICT (email) DO NOTHING RETURNING statement both
+        checks for duplicates and creates the user, so concurrent registrations with
+        the same email cannot race.
+
+        Args:
+            session (AsyncSession): The database session.
+            user_create (UserCreate): The user to create.
+            redis (Redis | None): The Redis client used to invalidate the cache.
+
+        Returns:
+            UserRow | None: The created user or None if the email is already taken.
+        """
+        result = await session.execute(
+            insert(UserModel)
+            .values(
+                email=user_create.email,
+                password_hash=user_create.password_hash,
+                name=user_create.name,
+                surname=user_create.surname,
+                requires_2fa=user_create.requires_2fa,
+            )
+            .on_conflict_do_nothing(index_elements=[UserModel.email])
+            .returning(*USER_COLUMNS)
+        )
+        user = result.first()
+        await session.commit()
+        if user is not None and redis is not None:
+            await self.invalidate(redis, user.id)
+        return user
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        limit: int,
+        after_id: int | None = None,
+    ) -> Sequence[UserRow]:
+        """Retrieve a page of users ordered by ID, selecting only the User columns.
+
+        Args:
+            session (AsyncSession): The database session.
+            limit (int): The maximum number of users to return.
+            after_id (int | None): Only return users with an ID greater than this one.
+
+        Returns:
+            Sequence[UserRow]: The user rows.
+        """
+        statement = select(*USER_COLUMNS).order_by(UserModel.id).limit(limit)
+        if after_id is not None:
+            statement = statement.where(UserModel.id > after_id)
+        result = await session.execute(statement)
+        return result.all()
+
+    async def stream_all(
+        self, session: AsyncSession, chunk_size: int
+    ) -> AsyncIterator[Sequence[UserRow]]:
+        """Stream all users ordered by ID, in chunks read with a server-side cursor.
+
+        Only the User columns are selected, so rows are never loaded as entities.
+
+        Args:
+            session (AsyncSession): The database session.
+            chunk_size (int): The number of users fetched per round trip.
+
+        Yields:
+            Sequence[UserRow]: The next chunk of user rows.
+        """
+        result = await session.stream(
+            select(*USER_COLUMNS)
+            .order_by(UserModel.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.partitions():
+            yield partition
 
     async def get(self, session: AsyncSession, user_id: int) -> UserModel | None:
         return await session.get(UserModel, user_id)
 
+    async def get_cached(
+        self, session: AsyncSession, redis: Redis, user_id: int
+    ) -> User | None:
+        """Retrieve a user through the read-through cache.
+
+        Users are served from the in-process cache when possible, then from Redis.
+        Concurrent misses on the same user share a single database query.
+        If Redis is unavailable the user is read from the database.
+
+        Args:
+            session (AsyncSession): The database session.
+            redis (Redis): The Redis client.
+            user_id (int): The user ID.
+
+        Returns:
+            User | None: The user or None if not found.
+        """
+        key = self._cache_key(user_id)
+        try:
+            cached = await self._cache.get(redis, key)
+        except RedisError as e:  # pragma: no cover
+            logger.warning(f"User cache unavailable: {e}")
+            return await self._load(session, user_id)
+        if cached is not None:
+            # written by load_and_cache from a validated user
+            return User.model_construct(**orjson.loads(cached))
+
+        async def load_and_cache() -> User | None:
+            user = await self._load(session, user_id)
+            if user is not None:
+                try:
+                    await redis.set(
+                        key, user.model_dump_json(), ex=settings.USER_CACHE_TTL_SECONDS
+                    )
+                except RedisError as e:  # pragma: no cover
+                    logger.warning(f"User cache unavailable: {e}")
+            return user
+
+        return await self._single_flight.do(user_id, load_and_cache)
+
+    async def get_row(self, session: AsyncSession, user_id: int) -> UserRow | None:
+        """Retrieve a user by ID, selecting only the User columns."""
+        result = await session.execute(
+            select(*USER_COLUMNS).where(UserModel.id == user_id)
+        )
+        return result.first()
+
+    async def _load(self, session: AsyncSession, user_id: int) -> User | None:
+        row = await self.get_row(session, user_id)
+        return user_from_row(row) if row else None
+
+    async def invalidate(self, redis: Redis, user_id: int) -> None:
+        """Remove a user from the cache, must be called after every write."""
+        key = self._cache_key(user_id)
+        self._cache.invalidate_local(key)
+        await redis.delete(key)
+
+    async def update_password_hash(
+        self, session: AsyncSession, user_id: int, password_hash: str
+    ) -> None:
+        await session.execute(
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(password_hash=password_hash)
+        )
+
 
-user_service = UserService()
+user_service = UserService(cache=local_cache)
@@ -0,0 +1,187 @@
+"""
+Pool warm-up at startup.
+
+A new process opens its database and Redis connections and spawns its password
+hashing workers lazily: without a warm-up, the first requests after a deploy or a
+scale-out pay for TCP, authentication, asyncpg type introspection and statement
+preparation, and process start-up. `Readiness.warm_up` pays them in advance, and
+/readyz reports the process as ready only once it is done.
+"""
+
+import asyncio
+import contextlib
+import time
+from collections.abc import Sequence
+from typing import cast
+
+from fastapi import Request
+from redis.asyncio.connection import Connection
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from sqlalchemy.pool import QueuePool
+
+from fastapi_2fa_example.auth.utils import hashing_pool, password_hasher
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.logger import logger
+from fastapi_2fa_example.redis import RedisAsyncConnectionPool
+from fastapi_2fa_example.users.service import user_service
+
+WARMUP_EMAIL = "warmup@example.invalid"
+
+
+def raise_first_error(results: Sequence[object]) -> None:
+    """Raise the first exception of `asyncio.gather(..., return_exceptions=True)`."""
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def warm_up_db_pool(engine: AsyncEngine, connections: int) -> int:
+    """Open up to `connections` database connections and prepare the hot queries.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+        connections (int): The number of connections to open, capped at the pool size.
+
+    Returns:
+        int: The number of connections opened.
+    """
+    connections = min(connections, cast(QueuePool, engine.pool).size())
+    # held together, so that each checkout opens a new connection
+    results = await asyncio.gather(
+        *(engine.connect() for _ in range(connections)), return_exceptions=True
+    )
+    opened = [result for result in results if isinstance(result, AsyncConnection)]
+    try:
+        raise_first_error(results)
+
+        async def prepare(session: AsyncSession) -> None:
+            await session.execute(select(1))
+            # the statements of login and /users/me, prepared on this connection
+            await user_service.get_by_email(session=session, email=WARMUP_EMAIL)
+            await user_service.get_row(session=session, user_id=0)
+            await session.rollback()
+
+        # every query completes before its connection is closed, even on errors
+        raise_first_error(
+            await asyncio.gather(
+                *(prepare(AsyncSession(bind=connection)) for connection in opened),
+                return_exceptions=True,
+            )
+        )
+    finally:
+        await asyncio.gather(*(connection.close() for connection in opened))
+    return len(opened)
+
+
+async def warm_up_redis_pool(pool: RedisAsyncConnectionPool, connections: int) -> int:
+    """Open `connections` Redis connections and ping them.
+
+    Args:
+        pool (RedisAsyncConnectionPool): The Redis connection pool.
+        connections (int): The number of connections to open, capped at the pool size.
+
+    Returns:
+        int: The number of connections opened.
+    """
+    connections = min(connections, pool.max_connections)
+    opened: list[Connection] = []
+    try:
+        # released even if a checkout fails partway
+        for _ in range(connections):
+            connection = await pool.get_connection()  # type: ignore[no-untyped-call]
+            opened.append(connection)
+
+        async def ping(connection: Connection) -> None:
+            await connection.send_command("PING")
+            await connection.read_response()
+
+        raise_first_error(
+            await asyncio.gather(
+                *(ping(connection) for connection in opened), return_exceptions=True
+            )
+        )
+    finally:
+        for connection in opened:
+            await pool.release(connection)
+    return len(opened)
+
+
+async def warm_up_hashing_pool() -> int:
+    """Start every password hashing worker.
+
+    Returns:
+        int: The number of hashing jobs run.
+    """
+    await asyncio.gather(
+        *(
+            hashing_pool.run(password_hasher.hash, WARMUP_EMAIL)
+            for _ in range(hashing_pool.max_workers)
+        )
+    )
+    return hashing_pool.max_workers
+
+
+class Readiness:
+    """Readiness of the process, reported by /readyz.
+
+    The warm-up runs in the background, so that the server accepts connections
+    (and answers the liveness probes) while it is in progress.
+    """
+
+    def __init__(self) -> None:
+        self.warmed_up = False
+        self._task: asyncio.Task[None] | None = None
+
+    async def warm_up(
+        self,
+        engine: AsyncEngine,
+        redis_pool: RedisAsyncConnectionPool,
+        db_connections: int = settings.WARMUP_POSTGRES_CONNECTIONS,
+        redis_connections: int = settings.WARMUP_REDIS_CONNECTIONS,
+    ) -> None:
+        """Warm up the pools, then mark the process as warmed up.
+
+        A failed warm-up is logged and does not block readiness: the pools then
+        simply open their connections on demand.
+        """
+        start = time.perf_counter()
+        try:
+            # each warm-up runs to completion, whatever happens to the others
+            results = await asyncio.gather(
+                warm_up_db_pool(engine, db_connections),
+                warm_up_redis_pool(redis_pool, redis_connections),
+                warm_up_hashing_pool(),
+                return_exceptions=True,
+            )
+            for name, result in zip(
+                ("Database", "Redis", "Password hashing"), results, strict=True
+            ):
+                if isinstance(result, BaseException):
+                    logger.warning(f"{name} warm-up failed: {result}")
+            db, redis, hashing = (
+                0 if isinstance(result, BaseException) else result for result in results
+            )
+            logger.info(
+                f"Warmed up {db} database and {redis} Redis connections and "
+                f"{hashing} hashing workers in {time.perf_counter() - start:.2f}s"
+            )
+        finally:
+            self.warmed_up = True
+
+    def start(self, engine: AsyncEngine, redis_pool: RedisAsyncConnectionPool) -> None:
+        """Start the warm-up in the background."""
+
+        self._task = asyncio.create_task(self.warm_up(engine, redis_pool))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+async def get_readiness(request: Request) -> Readiness:  # pragma: no cover
+    return cast(Readiness, request.state.readiness)
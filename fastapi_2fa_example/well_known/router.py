@@ -0,0 +1,20 @@
+from typing import Any
+
+from fastapi import APIRouter, Response
+
+from fastapi_2fa_example.auth.keys import get_jwt_keys
+from fastapi_2fa_example.config import settings
+
+router = APIRouter(prefix="/.well-known", tags=["well-known"])
+
+
+@router.get(
+    "/jwks.json",
+    summary="JSON Web Key Set",
+    description="Public keys used to verify the JWT tokens issued by this service.",
+)
+async def jwks(response: Response) -> dict[str, list[dict[str, Any]]]:
+    response.headers["Cache-Control"] = (
+        f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}"
+    )
+    return get_jwt_keys().jwks
@@ -0,0 +1,3 @@
+# !/bin/bash
+
+python -m fastapi_2fa_example.server
@@ -3,9 +3,11 @@ import logging
 from tests.fixtures.auth import *  # noqa: F401, F403
 from tests.fixtures.base import *  # noqa: F401, F403
 from tests.fixtures.database import *  # noqa: F401, F403
+from tests.fixtures.health import *  # noqa: F401, F403
 from tests.fixtures.mail_sender import *  # noqa: F401, F403
 from tests.fixtures.random_objects import *  # noqa: F401, F403
 from tests.fixtures.redis import *  # noqa: F401, F403
+from tests.fixtures.tracing import *  # noqa: F401, F403
 
 # Quiet down external libraries during testing
 logging.getLogger("asyncio").setLevel(logging.INFO)
@@ -1,8 +1,14 @@
+import asyncio
+import threading
+from collections.abc import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import pytest
 import pytest_asyncio
 
 from fastapi_2fa_example.auth.schemas import Token, TokenType
+from fastapi_2fa_example.auth.utils import PasswordHashingPool, hashing_pool
 from fastapi_2fa_example.models.user import User
 
 
@@ -14,3 +20,26 @@ async def access_token_fixture(random_user: User) -> Token:
         type=TokenType.ACCESS,
         exp=datetime.max,
     )
+
+
+@pytest_asyncio.fixture
+async def saturated_hashing_pool(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncGenerator[PasswordHashingPool]:
+    """Fixture that fills the shared hashing pool with `max_pending` blocked jobs."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(hashing_pool, "_executor", executor)
+    monkeypatch.setattr(hashing_pool, "max_pending", 2)
+    release = threading.Event()
+    jobs = [
+        asyncio.create_task(hashing_pool.run(release.wait))
+        for _ in range(hashing_pool.max_pending)
+    ]
+    await asyncio.sleep(0)  # let the jobs be submitted
+    assert hashing_pool.pending == hashing_pool.max_pending
+
+    yield hashing_pool
+
+    release.set()
+    await asyncio.gather(*jobs)
+    executor.shutdown()
@@ -4,23 +4,50 @@ import httpx
 import pytest
 import pytest_asyncio
 from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from fastapi_2fa_example.auth.dependencies import validate_access_token
 from fastapi_2fa_example.auth.schemas import Token
+from fastapi_2fa_example.health.monitor import HealthMonitor, get_health_monitor
+from fastapi_2fa_example.http_client import get_http_client
 from fastapi_2fa_example.main import app as _app
-from fastapi_2fa_example.postgres import AsyncSession, get_db_session
+from fastapi_2fa_example.postgres import (
+    AsyncSession,
+    get_db_session,
+    get_db_sessionmaker,
+)
 from fastapi_2fa_example.redis import RedisAsyncConnectionPool, get_redis_pool
+from fastapi_2fa_example.warmup import Readiness, get_readiness
+
+
+@pytest.fixture
+def readiness() -> Readiness:
+    return Readiness()
+
+
+@pytest.fixture
+def health_monitor() -> HealthMonitor:
+    return HealthMonitor()
 
 
 @pytest_asyncio.fixture
 async def app(
     session: AsyncSession,
     redis_pool: RedisAsyncConnectionPool,
+    http_client: httpx.AsyncClient,
     request: pytest.FixtureRequest,
     access_token_fixture: Token,
+    readiness: Readiness,
+    health_monitor: HealthMonitor,
 ) -> AsyncGenerator[FastAPI]:
     _app.dependency_overrides[get_db_session] = lambda: session
+    _app.dependency_overrides[get_db_sessionmaker] = lambda: async_sessionmaker(
+        bind=session.bind, expire_on_commit=False, class_=AsyncSession
+    )
     _app.dependency_overrides[get_redis_pool] = lambda: redis_pool
+    _app.dependency_overrides[get_http_client] = lambda: http_client
+    _app.dependency_overrides[get_readiness] = lambda: readiness
+    _app.dependency_overrides[get_health_monitor] = lambda: health_monitor
 
     # Check if the test has the 'auth' marker
     if request.node.get_closest_marker("auth"):  # type: ignore
@@ -29,7 +56,11 @@ async def app(
     yield _app
 
     _app.dependency_overrides.pop(get_db_session, None)
+    _app.dependency_overrides.pop(get_db_sessionmaker, None)
     _app.dependency_overrides.pop(get_redis_pool, None)
+    _app.dependency_overrides.pop(get_http_client, None)
+    _app.dependency_overrides.pop(get_readiness, None)
+    _app.dependency_overrides.pop(get_health_monitor, None)
     _app.dependency_overrides.pop(validate_access_token, None)
 
 
@@ -0,0 +1,20 @@
+from collections.abc import AsyncGenerator
+
+import pytest_asyncio
+
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.postgres import AsyncEngine, create_health_check_engine
+from fastapi_2fa_example.redis import Redis, create_health_check_client
+
+
+@pytest_asyncio.fixture
+async def health_check_engine() -> AsyncGenerator[AsyncEngine]:
+    engine = create_health_check_engine(settings)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def health_check_redis() -> AsyncGenerator[Redis]:
+    async with create_health_check_client() as redis:
+        yield redis
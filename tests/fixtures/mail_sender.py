@@ -1,7 +1,12 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from unittest.mock import AsyncMock, patch
 
+import httpx
 import pytest
+import pytest_asyncio
+
+from fastapi_2fa_example.http_client import create_http_client
+from fastapi_2fa_example.mail_sender import SENDGRID_URL, sendgrid_mock_transport
 
 
 @pytest.fixture
@@ -11,3 +16,11 @@ def mock_send_email() -> Generator[AsyncMock]:
     ) as mock:
         yield mock
         mock.reset_mock()
+
+
+@pytest_asyncio.fixture
+async def http_client() -> AsyncGenerator[httpx.AsyncClient]:
+    async with create_http_client(
+        mounts={SENDGRID_URL: sendgrid_mock_transport()}
+    ) as client:
+        yield client
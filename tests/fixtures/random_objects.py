@@ -4,6 +4,7 @@ import string
 import pytest_asyncio
 
 from fastapi_2fa_example.auth.schemas import OTP
+from fastapi_2fa_example.auth.service import otp_service
 from fastapi_2fa_example.auth.utils import generate_otp, hash_password
 from fastapi_2fa_example.models import User
 from fastapi_2fa_example.redis import Redis
@@ -50,8 +51,7 @@ async def create_otp(
     random_2fa_user: User,
 ) -> OTP:
     otp = OTP(user_id=random_2fa_user.id, otp=generate_otp())
-    key = f"otp:{otp.user_id}"
-    await redis.set(name=key, value=otp.model_dump_json())
+    await otp_service.add(redis=redis, otp=otp)
     return otp
 
 
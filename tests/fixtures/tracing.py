@@ -0,0 +1,61 @@
+from collections.abc import AsyncGenerator
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from opentelemetry import trace
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.redis import RedisInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from fastapi_2fa_example.main import create_app
+from fastapi_2fa_example.postgres import AsyncSession
+from fastapi_2fa_example.tracing import (
+    create_tracer_provider,
+    instrument_app,
+    instrument_engine,
+)
+
+_span_exporter = InMemorySpanExporter()
+
+
+@pytest.fixture(scope="session")
+def tracer_provider() -> TracerProvider:
+    # the global tracer provider can only be set once per process
+    provider = create_tracer_provider(_span_exporter, sample_ratio=1)
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+@pytest.fixture
+def span_exporter(tracer_provider: TracerProvider) -> InMemorySpanExporter:
+    tracer_provider.force_flush()
+    _span_exporter.clear()
+    return _span_exporter
+
+
+@pytest_asyncio.fixture
+async def traced_client(
+    app: FastAPI,
+    session: AsyncSession,
+    tracer_provider: TracerProvider,
+) -> AsyncGenerator[httpx.AsyncClient]:
+    traced_app = create_app()
+    traced_app.dependency_overrides = app.dependency_overrides
+    instrument_app(traced_app, tracer_provider)
+    assert session.bind is not None
+    instrument_engine(session.bind.engine, tracer_provider)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=traced_app), base_url="http://test"
+    ) as client:
+        yield client
+
+    FastAPIInstrumentor.uninstrument_app(traced_app)
+    RedisInstrumentor().uninstrument()
+    SQLAlchemyInstrumentor().uninstrument()
@@ -5,16 +5,20 @@ from fastapi import status
 from httpx import AsyncClient
 from pydantic import SecretStr
 
+from fastapi_2fa_example.auth import utils
 from fastapi_2fa_example.auth.schemas import (
+    OTP,
     LoginRequest,
     RegisterRequest,
     TokenType,
     TwoFARequest,
 )
 from fastapi_2fa_example.auth.service import otp_service
-from fastapi_2fa_example.auth.utils import create_jwt_token
+from fastapi_2fa_example.auth.utils import PasswordHasher, create_jwt_token
+from fastapi_2fa_example.config import settings
 from fastapi_2fa_example.models.user import User
 from fastapi_2fa_example.redis import Redis
+from tests.fixtures.database import RefreshFixture
 
 
 @pytest.mark.asyncio
@@ -48,6 +52,21 @@ class TestRegister:
         )
         assert response.status_code == status.HTTP_409_CONFLICT
 
+    @pytest.mark.usefixtures("saturated_hashing_pool")
+    async def test_register_hashing_pool_exhausted(self, client: AsyncClient) -> None:
+        register_request = RegisterRequest(
+            email="test@example.com",
+            password=SecretStr("password"),
+            name="test",
+            surname="test",
+            requires_2fa=False,
+        )
+        response = await client.post(
+            "/api/v1/auth/register", json=register_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["detail"] == "Server is busy, please retry later"
+
 
 @pytest.mark.asyncio
 class TestLogin:
@@ -68,6 +87,34 @@ class TestLogin:
 
         assert mock_send_email.call_count == 0  # no email should be sent
 
+    async def test_login_rehash_password(
+        self,
+        client: AsyncClient,
+        mock_send_email: AsyncMock,
+        random_user: User,
+        refresh_fixture: RefreshFixture,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(
+            utils, "password_hasher", PasswordHasher(["sha256_crypt"], rounds=1000)
+        )
+        old_password_hash = random_user.password_hash
+        assert utils.password_needs_update(old_password_hash)
+
+        login_request = LoginRequest(
+            email=random_user.email,
+            password=SecretStr("password"),
+        )
+        response = await client.post(
+            "/api/v1/auth/login", json=login_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        await refresh_fixture(random_user)
+        assert random_user.password_hash != old_password_hash
+        assert random_user.password_hash.startswith("$5$rounds=1000$")
+        assert utils.verify_password("password", random_user.password_hash)
+
     async def test_wrong_password(
         self, client: AsyncClient, mock_send_email: AsyncMock, random_user: User
     ) -> None:
@@ -82,6 +129,21 @@ class TestLogin:
 
         assert mock_send_email.call_count == 0  # no email should be sent
 
+    @pytest.mark.usefixtures("saturated_hashing_pool")
+    async def test_login_hashing_pool_exhausted(
+        self, client: AsyncClient, mock_send_email: AsyncMock, random_user: User
+    ) -> None:
+        login_request = LoginRequest(
+            email=random_user.email,
+            password=SecretStr("password"),
+        )
+        response = await client.post(
+            "/api/v1/auth/login", json=login_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+        assert mock_send_email.call_count == 0  # no email should be sent
+
     async def test_invalid_email(
         self, client: AsyncClient, mock_send_email: AsyncMock, random_user: User
     ) -> None:
@@ -116,6 +178,30 @@ class TestLogin:
         assert mock_send_email.call_args[1]["subject"] == "Your OTP Code"
         assert mock_send_email.call_args[1]["body"].split(": ")[1].isdigit()  # OTP code
 
+    async def test_login_2fa_mail_queue(
+        self,
+        client: AsyncClient,
+        redis: Redis,
+        mock_send_email: AsyncMock,
+        random_2fa_user: User,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(settings, "MAIL_QUEUE_ENABLED", True)
+        login_request = LoginRequest(
+            email=random_2fa_user.email,
+            password=SecretStr("password"),
+        )
+        response = await client.post(
+            "/api/v1/auth/login", json=login_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json().get("requires_2fa") is True
+
+        assert mock_send_email.call_count == 0  # sent by the mail worker
+        [(_, fields)] = await redis.xrange(settings.MAIL_QUEUE_STREAM)
+        assert fields["to_email"] == random_2fa_user.email
+        assert fields["subject"] == "Your OTP Code"
+
 
 @pytest.mark.asyncio
 class TestVerify2FA:
@@ -238,3 +324,125 @@ class TestVerify2FA:
             "/api/v1/auth/verify-2fa", json=two_fa_request.model_dump(mode="json")
         )
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_verify_2fa_too_many_attempts(
+        self, client: AsyncClient, redis: Redis, random_otp: OTP
+    ) -> None:
+        tmp_token = create_jwt_token(user_id=random_otp.user_id, type=TokenType.LOGIN)
+        wrong_otp = "000000" if random_otp.otp != "000000" else "111111"
+        two_fa_request = TwoFARequest(tmp_token=tmp_token, otp=wrong_otp)
+
+        for _ in range(settings.OTP_MAX_ATTEMPTS - 1):
+            response = await client.post(
+                "/api/v1/auth/verify-2fa", json=two_fa_request.model_dump(mode="json")
+            )
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = await client.post(
+            "/api/v1/auth/verify-2fa", json=two_fa_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+        # rejected early, even with the right OTP
+        two_fa_request = TwoFARequest(tmp_token=tmp_token, otp=random_otp.otp)
+        response = await client.post(
+            "/api/v1/auth/verify-2fa", json=two_fa_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    async def test_verify_2fa_user_locked_across_logins(
+        self, client: AsyncClient, redis: Redis, random_otp: OTP
+    ) -> None:
+        await redis.set(
+            otp_service._user_attempts_key(random_otp.user_id),
+            settings.OTP_MAX_ATTEMPTS_PER_USER,
+        )
+
+        # a fresh login token and OTP do not grant more attempts
+        tmp_token = create_jwt_token(user_id=random_otp.user_id, type=TokenType.LOGIN)
+        two_fa_request = TwoFARequest(tmp_token=tmp_token, otp=random_otp.otp)
+        response = await client.post(
+            "/api/v1/auth/verify-2fa", json=two_fa_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+@pytest.mark.asyncio
+class TestRateLimit:
+    async def test_login_rate_limited_by_email(
+        self,
+        client: AsyncClient,
+        random_user: User,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(settings, "RATE_LIMIT_EMAIL_PER_MINUTE", 2)
+        hash_password = AsyncMock(wraps=utils.verify_password_async)
+        monkeypatch.setattr(
+            "fastapi_2fa_example.auth.router.verify_password_async", hash_password
+        )
+        login_request = LoginRequest(
+            email=random_user.email, password=SecretStr("wrong_password")
+        )
+
+        for _ in range(2):
+            response = await client.post(
+                "/api/v1/auth/login", json=login_request.model_dump(mode="json")
+            )
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = await client.post(
+            "/api/v1/auth/login", json=login_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response.headers["Retry-After"]) > 0
+        # rejected before hashing
+        assert hash_password.await_count == 2
+
+    async def test_register_rate_limited_by_ip(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, "RATE_LIMIT_IP_PER_MINUTE", 1)
+        responses = [
+            await client.post(
+                "/api/v1/auth/register",
+                json=RegisterRequest(
+                    email=f"test{i}@example.com",
+                    password=SecretStr("password"),
+                    name="test",
+                    surname="test",
+                ).model_dump(mode="json"),
+            )
+            for i in range(2)
+        ]
+        assert [response.status_code for response in responses] == [
+            status.HTTP_201_CREATED,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ]
+
+    async def test_verify_2fa_rate_limited_by_ip(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, "RATE_LIMIT_IP_PER_MINUTE", 1)
+        two_fa_request = TwoFARequest(tmp_token="invalid_token", otp="000000")
+        responses = [
+            await client.post(
+                "/api/v1/auth/verify-2fa", json=two_fa_request.model_dump(mode="json")
+            )
+            for _ in range(2)
+        ]
+        assert [response.status_code for response in responses] == [
+            status.HTTP_401_UNAUTHORIZED,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ]
+
+    async def test_rate_limit_disabled(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+        monkeypatch.setattr(settings, "RATE_LIMIT_IP_PER_MINUTE", 1)
+        two_fa_request = TwoFARequest(tmp_token="invalid_token", otp="000000")
+        for _ in range(2):
+            response = await client.post(
+                "/api/v1/auth/verify-2fa", json=two_fa_request.model_dump(mode="json")
+            )
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -1,7 +1,10 @@
+import asyncio
+
 import pytest
 
-from fastapi_2fa_example.auth.schemas import OTP
+from fastapi_2fa_example.auth.schemas import OTP, OTPVerification
 from fastapi_2fa_example.auth.service import otp_service
+from fastapi_2fa_example.config import settings
 from fastapi_2fa_example.redis import Redis
 
 
@@ -105,3 +108,245 @@ class TestDelete:
             redis=redis, user_id=random_otp.user_id
         )
         assert otp_fetched_after_delete is None
+
+
+@pytest.mark.asyncio
+class TestConsume:
+    async def test_consume_match(self, redis: Redis, random_otp: OTP) -> None:
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=random_otp.otp,
+            tmp_token="tmp_token",
+        )
+        assert verification == OTPVerification.MATCH
+        assert (
+            await otp_service.get_by_user_id(redis=redis, user_id=random_otp.user_id)
+            is None
+        )
+
+    async def test_consume_mismatch(self, redis: Redis, random_otp: OTP) -> None:
+        wrong_otp = "000000" if random_otp.otp != "000000" else "111111"
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=wrong_otp,
+            tmp_token="tmp_token",
+        )
+        assert verification == OTPVerification.MISMATCH
+        # a wrong attempt does not consume the OTP
+        assert (
+            await otp_service.get_by_user_id(redis=redis, user_id=random_otp.user_id)
+            is not None
+        )
+
+    async def test_consume_missing(self, redis: Redis) -> None:
+        verification = await otp_service.consume(
+            redis=redis, user_id=123, otp="123456", tmp_token="tmp_token"
+        )
+        assert verification == OTPVerification.MISSING
+
+    async def test_consume_concurrent(self, redis: Redis, random_otp: OTP) -> None:
+        results = await asyncio.gather(
+            *(
+                otp_service.consume(
+                    redis=redis,
+                    user_id=random_otp.user_id,
+                    otp=random_otp.otp,
+                    tmp_token="tmp_token",
+                )
+                for _ in range(10)
+            )
+        )
+        assert results.count(OTPVerification.MATCH) == 1
+        assert results.count(OTPVerification.MISSING) == 9
+
+    async def test_consume_script_not_loaded(
+        self, redis: Redis, random_otp: OTP
+    ) -> None:
+        await redis.script_flush()
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=random_otp.otp,
+            tmp_token="tmp_token",
+        )
+        assert verification == OTPVerification.MATCH
+
+
+@pytest.mark.asyncio
+class TestStorageFormat:
+    async def test_add_compact_hash(self, redis: Redis) -> None:
+        await otp_service.add(redis=redis, otp=OTP(user_id=123, otp="654321"))
+
+        stored = await redis.hgetall("otp:123")
+        assert stored.keys() == {"otp", "issued_at"}
+        assert stored["otp"] == "654321"
+        assert 0 < await redis.ttl("otp:123") <= settings.OTP_EXPIRE_MINUTES * 60
+
+    async def test_legacy_json_format(self, redis: Redis) -> None:
+        legacy = OTP(user_id=123, otp="654321")
+        await redis.set("otp:123", legacy.model_dump_json())
+
+        assert await otp_service.get_by_user_id(redis=redis, user_id=123) == legacy
+        assert (
+            await otp_service.consume(
+                redis=redis, user_id=123, otp="000000", tmp_token="tmp_token"
+            )
+            == OTPVerification.MISMATCH
+        )
+        assert (
+            await otp_service.consume(
+                redis=redis, user_id=123, otp="654321", tmp_token="tmp_token"
+            )
+            == OTPVerification.MATCH
+        )
+        assert await otp_service.get_by_user_id(redis=redis, user_id=123) is None
+
+    async def test_add_replaces_legacy_json_format(self, redis: Redis) -> None:
+        await redis.set("otp:123", OTP(user_id=123, otp="654321").model_dump_json())
+        await otp_service.add(redis=redis, otp=OTP(user_id=123, otp="785876"))
+
+        otp = await otp_service.get_by_user_id(redis=redis, user_id=123)
+        assert otp is not None
+        assert otp.otp == "785876"
+
+
+@pytest.mark.asyncio
+class TestAttempts:
+    async def test_otp_locked_after_max_attempts(
+        self, redis: Redis, random_otp: OTP
+    ) -> None:
+        wrong_otp = "000000" if random_otp.otp != "000000" else "111111"
+        for i in range(settings.OTP_MAX_ATTEMPTS - 1):
+            verification = await otp_service.consume(
+                redis=redis,
+                user_id=random_otp.user_id,
+                otp=wrong_otp,
+                tmp_token=f"tmp_token_{i}",
+            )
+            assert verification == OTPVerification.MISMATCH
+
+        # attempts are also counted per OTP: a new token does not reset them
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=wrong_otp,
+            tmp_token="another_tmp_token",
+        )
+        assert verification == OTPVerification.LOCKED
+        # the OTP is invalidated
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=random_otp.otp,
+            tmp_token="yet_another_tmp_token",
+        )
+        assert verification == OTPVerification.MISSING
+
+    async def test_token_locked_after_max_attempts(
+        self, redis: Redis, random_otp: OTP
+    ) -> None:
+        wrong_otp = "000000" if random_otp.otp != "000000" else "111111"
+        for _ in range(settings.OTP_MAX_ATTEMPTS - 1):
+            await otp_service.consume(
+                redis=redis,
+                user_id=random_otp.user_id,
+                otp=wrong_otp,
+                tmp_token="tmp_token",
+            )
+            # a new OTP resets the OTP counter, not the token counter
+            await otp_service.add(redis=redis, otp=random_otp)
+        assert not await otp_service.is_locked(
+            redis=redis, user_id=random_otp.user_id, tmp_token="tmp_token"
+        )
+
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=wrong_otp,
+            tmp_token="tmp_token",
+        )
+        assert verification == OTPVerification.LOCKED
+        assert await otp_service.is_locked(
+            redis=redis, user_id=random_otp.user_id, tmp_token="tmp_token"
+        )
+        assert (
+            await redis.ttl(otp_service._attempts_key("tmp_token"))
+            <= settings.LOGIN_TOKEN_EXPIRE_MINUTES * 60
+        )
+
+        # even the right OTP is rejected with a locked token
+        await otp_service.add(redis=redis, otp=random_otp)
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=random_otp.otp,
+            tmp_token="tmp_token",
+        )
+        assert verification == OTPVerification.LOCKED
+
+    async def test_user_locked_across_logins(
+        self, redis: Redis, random_otp: OTP
+    ) -> None:
+        wrong_otp = "000000" if random_otp.otp != "000000" else "111111"
+        for i in range(settings.OTP_MAX_ATTEMPTS_PER_USER - 1):
+            # every login issues a new OTP and a new token
+            await otp_service.add(redis=redis, otp=random_otp)
+            verification = await otp_service.consume(
+                redis=redis,
+                user_id=random_otp.user_id,
+                otp=wrong_otp,
+                tmp_token=f"tmp_token_{i}",
+            )
+            assert verification == OTPVerification.MISMATCH
+
+        await otp_service.add(redis=redis, otp=random_otp)
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=wrong_otp,
+            tmp_token="last_tmp_token",
+        )
+        assert verification == OTPVerification.LOCKED
+        assert await otp_service.is_locked(
+            redis=redis, user_id=random_otp.user_id, tmp_token="new_tmp_token"
+        )
+        assert (
+            0
+            < await redis.ttl(otp_service._user_attempts_key(random_otp.user_id))
+            <= settings.OTP_USER_ATTEMPTS_WINDOW_MINUTES * 60
+        )
+
+        # logging in again does not unlock the user, even with the right OTP
+        await otp_service.add(redis=redis, otp=random_otp)
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=random_otp.otp,
+            tmp_token="new_tmp_token",
+        )
+        assert verification == OTPVerification.LOCKED
+
+    async def test_match_resets_user_attempts(
+        self, redis: Redis, random_otp: OTP
+    ) -> None:
+        wrong_otp = "000000" if random_otp.otp != "000000" else "111111"
+        await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=wrong_otp,
+            tmp_token="tmp_token",
+        )
+        assert await redis.get(otp_service._user_attempts_key(random_otp.user_id))
+
+        verification = await otp_service.consume(
+            redis=redis,
+            user_id=random_otp.user_id,
+            otp=random_otp.otp,
+            tmp_token="tmp_token",
+        )
+        assert verification == OTPVerification.MATCH
+        assert not await redis.exists(
+            otp_service._user_attempts_key(random_otp.user_id)
+        )
@@ -0,0 +1,119 @@
+import asyncio
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+
+from fastapi_2fa_example.cache import TwoTierCache
+from fastapi_2fa_example.redis import Redis, RedisAsyncConnectionPool
+
+
+async def wait_for_eviction(cache: TwoTierCache, size: int) -> None:
+    for _ in range(100):
+        if len(cache) == size:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("invalidation not received")
+
+
+@pytest_asyncio.fixture
+async def two_tier_cache(
+    redis_pool: RedisAsyncConnectionPool,
+) -> AsyncGenerator[TwoTierCache]:
+    cache = TwoTierCache(prefixes=["test:"], max_size=2, ttl_seconds=60)
+    await cache.start(redis_pool)
+    yield cache
+    await cache.stop()
+
+
+@pytest.mark.asyncio
+class TestTwoTierCache:
+    async def test_get(self, two_tier_cache: TwoTierCache, redis: Redis) -> None:
+        assert two_tier_cache.is_tracking
+        await redis.set("test:key", "value")
+
+        assert await two_tier_cache.get(redis, "test:key") == "value"
+        assert two_tier_cache.misses == 1
+        assert await two_tier_cache.get(redis, "test:key") == "value"
+        assert two_tier_cache.hits == 1
+
+    async def test_get_missing(
+        self, two_tier_cache: TwoTierCache, redis: Redis
+    ) -> None:
+        assert await two_tier_cache.get(redis, "test:missing") is None
+        assert len(two_tier_cache) == 0
+
+    async def test_invalidation(
+        self, two_tier_cache: TwoTierCache, redis: Redis
+    ) -> None:
+        await redis.set("test:key", "value")
+        assert await two_tier_cache.get(redis, "test:key") == "value"
+        assert len(two_tier_cache) == 1
+
+        # a write from any client evicts the local entry
+        await redis.set("test:key", "new value")
+        await wait_for_eviction(two_tier_cache, 0)
+        assert await two_tier_cache.get(redis, "test:key") == "new value"
+
+    async def test_flush_invalidation(
+        self, two_tier_cache: TwoTierCache, redis: Redis
+    ) -> None:
+        await redis.set("test:key", "value")
+        assert await two_tier_cache.get(redis, "test:key") == "value"
+
+        await redis.flushdb()  # type: ignore
+        await wait_for_eviction(two_tier_cache, 0)
+
+    async def test_lru_eviction(
+        self, two_tier_cache: TwoTierCache, redis: Redis
+    ) -> None:
+        for i in range(3):
+            await redis.set(f"test:{i}", str(i))
+            await two_tier_cache.get(redis, f"test:{i}")
+        assert len(two_tier_cache) == 2
+
+        hits = two_tier_cache.hits
+        assert await two_tier_cache.get(redis, "test:0") == "0"
+        assert two_tier_cache.hits == hits  # evicted, served by Redis
+
+    async def test_invalidate_local(
+        self, two_tier_cache: TwoTierCache, redis: Redis
+    ) -> None:
+        await redis.set("test:key", "value")
+        await two_tier_cache.get(redis, "test:key")
+        two_tier_cache.invalidate_local("test:key")
+        assert len(two_tier_cache) == 0
+
+    async def test_not_tracking(self, redis: Redis) -> None:
+        cache = TwoTierCache(prefixes=["test:"], max_size=2, ttl_seconds=60)
+        await redis.set("test:key", "value")
+
+        # without tracking, every read goes to Redis
+        assert await cache.get(redis, "test:key") == "value"
+        assert await cache.get(redis, "test:key") == "value"
+        assert len(cache) == 0
+        assert cache.hits == 0
+
+    async def test_stop(
+        self, redis_pool: RedisAsyncConnectionPool, redis: Redis
+    ) -> None:
+        cache = TwoTierCache(prefixes=["test:"], max_size=2, ttl_seconds=60)
+        await cache.start(redis_pool)
+        await redis.set("test:key", "value")
+        await cache.get(redis, "test:key")
+
+        await cache.stop()
+        assert not cache.is_tracking
+        assert len(cache) == 0
+
+    async def test_ttl(
+        self, redis_pool: RedisAsyncConnectionPool, redis: Redis
+    ) -> None:
+        cache = TwoTierCache(prefixes=["test:"], max_size=2, ttl_seconds=0)
+        await cache.start(redis_pool)
+        await redis.set("test:key", "value")
+
+        assert await cache.get(redis, "test:key") == "value"
+        assert await cache.get(redis, "test:key") == "value"
+        assert cache.hits == 0  # expired immediately
+        await cache.stop()
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from fastapi_2fa_example.health.monitor import NOT_CHECKED, HealthMonitor, timed_check
+from fastapi_2fa_example.postgres import AsyncEngine
+from fastapi_2fa_example.redis import Redis
+
+
+@pytest.mark.asyncio
+class TestTimedCheck:
+    async def test_healthy(self) -> None:
+        status = await timed_check(lambda: asyncio.sleep(0), timeout_seconds=1)
+        assert status.healthy
+        assert status.error is None
+        assert status.latency_ms is not None
+        assert status.checked_at is not None
+
+    async def test_timeout(self) -> None:
+        status = await timed_check(lambda: asyncio.sleep(1), timeout_seconds=0.01)
+        assert not status.healthy
+        assert status.error == "TimeoutError"
+
+
+@pytest.mark.asyncio
+class TestHealthMonitor:
+    async def test_check(
+        self, health_check_engine: AsyncEngine, health_check_redis: Redis
+    ) -> None:
+        monitor = HealthMonitor()
+        assert not monitor.healthy
+
+        await monitor.check(health_check_engine, health_check_redis)
+        assert monitor.healthy
+        report = monitor.report()
+        assert report["postgres"]["healthy"]
+        assert report["redis"]["latency_ms"] > 0
+
+    async def test_check_failure_and_recovery(
+        self, health_check_engine: AsyncEngine, health_check_redis: Redis
+    ) -> None:
+        monitor = HealthMonitor(timeout_seconds=1)
+        await monitor.check(health_check_engine, health_check_redis)
+
+        # nothing listens on port 1
+        unreachable = Redis(port=1)
+        await monitor.check(health_check_engine, unreachable)
+        await unreachable.aclose()
+        assert not monitor.healthy
+        assert monitor.postgres.healthy
+        assert monitor.redis.error is not None
+
+        await monitor.check(health_check_engine, health_check_redis)
+        assert monitor.healthy
+
+    async def test_stale_status(
+        self, health_check_engine: AsyncEngine, health_check_redis: Redis
+    ) -> None:
+        monitor = HealthMonitor(interval_seconds=0.01)
+        await monitor.check(health_check_engine, health_check_redis)
+
+        await asyncio.sleep(0.05)
+        assert monitor.postgres.healthy
+        assert not monitor.healthy
+
+    async def test_start(
+        self, health_check_engine: AsyncEngine, health_check_redis: Redis
+    ) -> None:
+        monitor = HealthMonitor(interval_seconds=0.01)
+        monitor.start(health_check_engine, health_check_redis)
+        for _ in range(100):
+            if monitor.postgres is not NOT_CHECKED:
+                break
+            await asyncio.sleep(0.01)
+        assert monitor.healthy
+
+        await monitor.stop()
+        assert monitor._task is None
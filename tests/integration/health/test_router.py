@@ -2,8 +2,72 @@ import pytest
 from fastapi import status
 from httpx import AsyncClient
 
+from fastapi_2fa_example.health.monitor import HealthMonitor
+from fastapi_2fa_example.postgres import AsyncEngine
+from fastapi_2fa_example.redis import Redis
+from fastapi_2fa_example.warmup import Readiness
+
 
 @pytest.mark.asyncio
 async def test_healthz(client: AsyncClient) -> None:
     response = await client.get("/healthz")
     assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_metrics(client: AsyncClient) -> None:
+    await client.get("/healthz")
+
+    response = await client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/healthz",status="200"}'
+        in response.text
+    )
+    for metric in (
+        "db_pool_checkout_duration_seconds",
+        "db_pool_connections_in_use",
+        "redis_pool_connections_in_use",
+        "redis_pool_max_connections",
+        "otp_issued_total",
+        "otp_failed_total",
+        "token_cache_hits_total",
+        "token_cache_misses_total",
+    ):
+        assert metric in response.text
+
+
+@pytest.mark.asyncio
+async def test_livez(client: AsyncClient) -> None:
+    response = await client.get("/livez")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_readyz(
+    client: AsyncClient,
+    readiness: Readiness,
+    health_monitor: HealthMonitor,
+    health_check_engine: AsyncEngine,
+    health_check_redis: Redis,
+) -> None:
+    response = await client.get("/readyz")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["postgres"]["error"] == "not checked yet"
+
+    await health_monitor.check(health_check_engine, health_check_redis)
+    response = await client.get("/readyz")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["warmed_up"] is False
+
+    readiness.warmed_up = True
+    response = await client.get("/readyz")
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["status"] == "ok"
+    for dependency in ("postgres", "redis"):
+        assert body[dependency]["healthy"] is True
+        assert body[dependency]["latency_ms"] > 0
+        assert body[dependency]["age_seconds"] >= 0
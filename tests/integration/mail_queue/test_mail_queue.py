@@ -0,0 +1,128 @@
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.mail_queue import CONSUMER_GROUP, MailWorker, mail_queue
+from fastapi_2fa_example.mail_sender import EmailMessage
+from fastapi_2fa_example.redis import Redis
+
+EMAIL = EmailMessage(to_email="john@example.com", subject="Subject", body="Body")
+
+
+@pytest.fixture
+def send_email(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    mock = AsyncMock()
+    monkeypatch.setattr("fastapi_2fa_example.mail_queue.send_email", mock)
+    monkeypatch.setattr(settings, "MAIL_WORKER_RETRY_BACKOFF_SECONDS", 0)
+    return mock
+
+
+def create_worker(
+    redis: Redis, client: httpx.AsyncClient, consumer: str = "worker"
+) -> MailWorker:
+    return MailWorker(redis=redis, client=client, consumer=consumer)
+
+
+@pytest.mark.asyncio
+class TestMailWorker:
+    async def test_send_batch(
+        self, redis: Redis, http_client: httpx.AsyncClient, send_email: AsyncMock
+    ) -> None:
+        worker = create_worker(redis, http_client)
+        await worker.ensure_group()
+        await worker.ensure_group()  # idempotent
+        for _ in range(3):
+            await mail_queue.enqueue(redis=redis, message=EMAIL)
+
+        assert await worker.process_batch(block=None) == 3
+        assert send_email.await_count == 3
+        assert send_email.call_args.kwargs == {
+            "to_email": EMAIL.to_email,
+            "subject": EMAIL.subject,
+            "body": EMAIL.body,
+            "client": worker.client,
+        }
+        # acknowledged and deleted
+        assert await redis.xlen(settings.MAIL_QUEUE_STREAM) == 0
+        assert await worker.process_batch(block=None) == 0
+
+    async def test_retry(
+        self, redis: Redis, http_client: httpx.AsyncClient, send_email: AsyncMock
+    ) -> None:
+        send_email.side_effect = [httpx.ConnectError("error"), None]
+        worker = create_worker(redis, http_client)
+        await worker.ensure_group()
+        await mail_queue.enqueue(redis=redis, message=EMAIL)
+
+        assert await worker.process_batch(block=None) == 1
+        assert send_email.await_count == 2
+        assert await redis.xlen(settings.MAIL_QUEUE_DEAD_LETTER_STREAM) == 0
+
+    async def test_dead_letter(
+        self, redis: Redis, http_client: httpx.AsyncClient, send_email: AsyncMock
+    ) -> None:
+        send_email.side_effect = httpx.ConnectError("error")
+        worker = create_worker(redis, http_client)
+        await worker.ensure_group()
+        message_id = await mail_queue.enqueue(redis=redis, message=EMAIL)
+
+        assert await worker.process_batch(block=None) == 1
+        assert send_email.await_count == settings.MAIL_WORKER_MAX_RETRIES + 1
+        [(_, fields)] = await redis.xrange(settings.MAIL_QUEUE_DEAD_LETTER_STREAM)
+        assert fields == {
+            "message_id": message_id,
+            "to_email": EMAIL.to_email,
+            "subject": EMAIL.subject,
+            "error": "error",
+            "attempts": str(settings.MAIL_WORKER_MAX_RETRIES + 1),
+        }
+        assert await redis.xlen(settings.MAIL_QUEUE_STREAM) == 0
+
+    async def test_reclaim_from_crashed_worker(
+        self,
+        redis: Redis,
+        http_client: httpx.AsyncClient,
+        send_email: AsyncMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        crashed_worker = create_worker(redis, http_client, consumer="crashed")
+        await crashed_worker.ensure_group()
+        await mail_queue.enqueue(redis=redis, message=EMAIL)
+        await mail_queue.enqueue(redis=redis, message=EMAIL)
+        # read but never acknowledged
+        assert len(await crashed_worker._read(block=None)) == 2
+        # one of the pending emails was trimmed from the stream
+        [(trimmed_id, _), _] = await redis.xrange(settings.MAIL_QUEUE_STREAM)
+        await redis.xdel(settings.MAIL_QUEUE_STREAM, trimmed_id)
+
+        worker = create_worker(redis, http_client)
+        assert await worker.process_batch(block=None) == 0  # not idle long enough
+
+        monkeypatch.setattr(settings, "MAIL_WORKER_CLAIM_IDLE_SECONDS", 0)
+        assert await worker.process_batch(block=None) == 1
+        assert send_email.await_count == 1
+        assert await redis.xlen(settings.MAIL_QUEUE_STREAM) == 0
+
+    async def test_leave_group(
+        self, redis: Redis, http_client: httpx.AsyncClient
+    ) -> None:
+        worker = create_worker(redis, http_client)
+        await worker.ensure_group()
+        await mail_queue.enqueue(redis=redis, message=EMAIL)
+        [(message_id, _)] = await worker._read(block=None)
+
+        # the pending email stays with the consumer
+        assert not await worker.leave_group()
+        consumers = await redis.xinfo_consumers(
+            settings.MAIL_QUEUE_STREAM, CONSUMER_GROUP
+        )
+        assert [consumer["name"] for consumer in consumers] == ["worker"]
+
+        await worker._ack([message_id])
+        assert await worker.leave_group()
+        assert (
+            await redis.xinfo_consumers(settings.MAIL_QUEUE_STREAM, CONSUMER_GROUP)
+            == []
+        )
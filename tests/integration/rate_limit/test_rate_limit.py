@@ -0,0 +1,65 @@
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from redis.asyncio import BlockingConnectionPool
+
+from fastapi_2fa_example.rate_limit import Limit, RateLimiter
+from fastapi_2fa_example.redis import Redis, RedisAsyncConnectionPool
+
+
+@pytest_asyncio.fixture
+async def unavailable_redis_pool() -> AsyncGenerator[RedisAsyncConnectionPool]:
+    pool = BlockingConnectionPool(host="localhost", port=1, socket_connect_timeout=1)
+    yield pool
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+    async def test_burst_then_limited(
+        self, redis_pool: RedisAsyncConnectionPool, redis: Redis
+    ) -> None:
+        limiter = RateLimiter()
+        limits = [Limit("test", rate=3, period_seconds=60)]
+
+        for _ in range(3):
+            assert await limiter.hit(redis_pool, limits) == 0
+        retry_after = await limiter.hit(redis_pool, limits)
+        assert 0 < retry_after <= 20
+        assert 0 < await redis.pttl("rate_limit:test") <= 60_000
+
+    async def test_all_limits_must_allow(
+        self, redis_pool: RedisAsyncConnectionPool, redis: Redis
+    ) -> None:
+        limiter = RateLimiter()
+        ip_limit = Limit("ip", rate=10)
+        email_limit = Limit("email", rate=1)
+
+        assert await limiter.hit(redis_pool, [ip_limit, email_limit]) == 0
+        assert await limiter.hit(redis_pool, [ip_limit, email_limit]) > 0
+        # a rejected request is not counted against the other limits
+        tat = await redis.get("rate_limit:ip")
+        assert await limiter.hit(redis_pool, [ip_limit, email_limit]) > 0
+        assert await redis.get("rate_limit:ip") == tat
+        # other emails are not limited
+        assert await limiter.hit(redis_pool, [ip_limit, Limit("other", rate=1)]) == 0
+
+    async def test_local_fallback(
+        self, unavailable_redis_pool: RedisAsyncConnectionPool
+    ) -> None:
+        limiter = RateLimiter()
+        limits = [Limit("test", rate=2)]
+
+        assert await limiter.hit(unavailable_redis_pool, limits) == 0
+        assert await limiter.hit(unavailable_redis_pool, limits) == 0
+        assert await limiter.hit(unavailable_redis_pool, limits) > 0
+        assert await limiter.hit(unavailable_redis_pool, [Limit("other", rate=2)]) == 0
+
+    async def test_local_fallback_bounded(
+        self, unavailable_redis_pool: RedisAsyncConnectionPool
+    ) -> None:
+        limiter = RateLimiter(local_max_size=2)
+        for key in ("a", "b", "c"):
+            assert await limiter.hit(unavailable_redis_pool, [Limit(key, rate=1)]) == 0
+        assert len(limiter._local_tats) <= 2
@@ -0,0 +1,83 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from pydantic import SecretStr
+
+from fastapi_2fa_example.auth.schemas import LoginRequest
+from fastapi_2fa_example.models.user import User
+from fastapi_2fa_example.tracing import create_tracer_provider
+
+
+@pytest.mark.asyncio
+class TestTracing:
+    async def test_login_spans(
+        self,
+        traced_client: AsyncClient,
+        tracer_provider: TracerProvider,
+        span_exporter: InMemorySpanExporter,
+        mock_send_email: AsyncMock,
+        random_2fa_user: User,
+    ) -> None:
+        login_request = LoginRequest(
+            email=random_2fa_user.email, password=SecretStr("password")
+        )
+        response = await traced_client.post(
+            "/api/v1/auth/login", json=login_request.model_dump(mode="json")
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        tracer_provider.force_flush()
+        spans = span_exporter.get_finished_spans()
+        names = {span.name for span in spans}
+        assert {
+            "POST /api/v1/auth/login",
+            "user_service.get_by_email",
+            "verify_password",
+            "otp_service.add",
+            "send_email",
+        } <= names
+
+        db_systems = {(span.attributes or {}).get("db.system") for span in spans}
+        assert {"postgresql", "redis"} <= db_systems
+
+        # the steps belong to the request trace
+        (request_span,) = [s for s in spans if s.name == "POST /api/v1/auth/login"]
+        assert request_span.context is not None
+        steps = [s for s in spans if s.name in {"verify_password", "send_email"}]
+        assert all(
+            step.parent is not None
+            and step.parent.trace_id == request_span.context.trace_id
+            for step in steps
+        )
+
+    async def test_excluded_urls(
+        self,
+        traced_client: AsyncClient,
+        tracer_provider: TracerProvider,
+        span_exporter: InMemorySpanExporter,
+    ) -> None:
+        response = await traced_client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+
+        tracer_provider.force_flush()
+        assert span_exporter.get_finished_spans() == ()
+
+
+class TestSampling:
+    def test_sample_ratio(self) -> None:
+        exporter = InMemorySpanExporter()
+        provider = create_tracer_provider(exporter, sample_ratio=0)
+        tracer = provider.get_tracer("test")
+
+        with tracer.start_as_current_span("not sampled") as span:
+            assert not span.is_recording()
+
+        provider.force_flush()
+        assert exporter.get_finished_spans() == ()
+        provider.shutdown()
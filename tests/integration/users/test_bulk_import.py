@@ -0,0 +1,102 @@
+import json
+from collections.abc import Iterator
+
+import pytest
+
+from fastapi_2fa_example.auth.utils import PasswordHashingPool, verify_password
+from fastapi_2fa_example.postgres import AsyncSession
+from fastapi_2fa_example.users import bulk_import
+from fastapi_2fa_example.users.service import user_service
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_user
+
+
+@pytest.fixture
+def pool() -> Iterator[PasswordHashingPool]:
+    pool = PasswordHashingPool(executor_type="thread", max_workers=2, max_pending=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_parse_records_csv() -> None:
+    lines = [
+        "email,password,name,surname,requires_2fa",
+        "a@example.com,password123,A,User,true",
+        "b@example.com,password123,B,User,",
+    ]
+    assert list(bulk_import.parse_records(lines, "csv")) == [
+        (
+            2,
+            {
+                "email": "a@example.com",
+                "password": "password123",
+                "name": "A",
+                "surname": "User",
+                "requires_2fa": "true",
+            },
+        ),
+        (
+            3,
+            {
+                "email": "b@example.com",
+                "password": "password123",
+                "name": "B",
+                "surname": "User",
+            },
+        ),
+    ]
+
+
+def test_parse_records_ndjson() -> None:
+    lines = ['{"email": "a@example.com"}', "", "{invalid", "[1, 2]"]
+    assert list(bulk_import.parse_records(lines, "ndjson")) == [
+        (1, {"email": "a@example.com"}),
+        (3, "Invalid JSON: Expecting property name enclosed in double quotes"),
+        (4, "Invalid JSON: expected an object"),
+    ]
+
+
+@pytest.mark.asyncio
+class TestImportUsers:
+    async def test_import_users_csv(
+        self, session: AsyncSession, pool: PasswordHashingPool
+    ) -> None:
+        lines = ["email,password,name,surname,requires_2fa"] + [
+            f"user{i}@example.com,password{i}00,Name{i},Surname{i},{i % 2 == 0}"
+            for i in range(5)
+        ]
+        result = await bulk_import.import_users(
+            session, lines, "csv", batch_size=2, pool=pool
+        )
+        assert result.inserted == 5
+        assert result.duplicates == []
+        assert result.invalid == []
+
+        user = await user_service.get_by_email(session, "user0@example.com")
+        assert user is not None
+        assert user.name == "Name0"
+        assert user.requires_2fa is True
+        assert verify_password("password000", user.password_hash)
+
+    async def test_import_users_duplicates_and_invalid(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        pool: PasswordHashingPool,
+    ) -> None:
+        existing = await create_user(save_fixture)
+        records = [
+            {"email": "new@example.com", "password": "password123"},
+            {"email": existing.email, "password": "password123"},
+            {"email": "new@example.com", "password": "password456"},
+            {"email": "not-an-email", "password": "password123"},
+        ]
+        lines = [
+            json.dumps({"name": "Name", "surname": "Surname", **record})
+            for record in records
+        ]
+        result = await bulk_import.import_users(session, lines, "ndjson", pool=pool)
+        assert result.inserted == 1
+        assert sorted(result.duplicates) == sorted([existing.email, "new@example.com"])
+        assert [row.line for row in result.invalid] == [4]
+        assert result.invalid[0].error.startswith("email:")
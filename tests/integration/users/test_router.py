@@ -1,9 +1,13 @@
+import json
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
+from pydantic import SecretStr
 
 from fastapi_2fa_example.auth.schemas import TokenType
 from fastapi_2fa_example.auth.utils import create_jwt_token
+from fastapi_2fa_example.config import settings
 from fastapi_2fa_example.models.user import User
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import create_user
@@ -70,3 +74,156 @@ class TestGetAll:
             headers=headers,
         )
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.auth
+    async def test_get_all_users_paginated(
+        self, client: AsyncClient, save_fixture: SaveFixture
+    ) -> None:
+        for _ in range(2):
+            await create_user(save_fixture)
+
+        response = await client.get(
+            "/api/v1/users",
+            params={"limit": 2},
+            headers={"Origin": "https://example.com"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        first_page = response.json()
+        assert len(first_page) == 2
+        cursor = response.headers["X-Next-Cursor"]
+        assert cursor == str(first_page[-1]["id"])
+        assert response.headers["Access-Control-Expose-Headers"] == "X-Next-Cursor"
+
+        response = await client.get(
+            "/api/v1/users", params={"limit": 2, "cursor": cursor}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        second_page = response.json()
+        assert len(second_page) == 1  # 3 users: 1 from token fixture + 2 created here
+        assert second_page[0]["id"] > first_page[-1]["id"]
+        assert "X-Next-Cursor" not in response.headers
+
+    @pytest.mark.auth
+    async def test_get_all_users_invalid_limit(self, client: AsyncClient) -> None:
+        response = await client.get("/api/v1/users", params={"limit": 0})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+class TestStream:
+    @pytest.mark.auth
+    async def test_stream_users_ndjson(
+        self, client: AsyncClient, save_fixture: SaveFixture
+    ) -> None:
+        await create_user(save_fixture)
+
+        response = await client.get("/api/v1/users/stream")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        users = [json.loads(line) for line in response.text.splitlines()]
+        assert len(users) == 2  # 1 from token fixture + 1 created here
+        assert users[0]["id"] < users[1]["id"]
+
+    @pytest.mark.auth
+    async def test_stream_users_json(
+        self, client: AsyncClient, save_fixture: SaveFixture
+    ) -> None:
+        await create_user(save_fixture)
+
+        response = await client.get("/api/v1/users/stream", params={"format": "json"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/json"
+        assert len(response.json()) == 2
+
+    async def test_stream_users_unauthenticated(self, client: AsyncClient) -> None:
+        response = await client.get("/api/v1/users/stream")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+class TestImport:
+    @pytest.fixture(autouse=True)
+    def admin_key(self, monkeypatch: pytest.MonkeyPatch) -> str:
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", SecretStr("admin-key"))
+        return "admin-key"
+
+    async def test_import_users_ndjson(
+        self, client: AsyncClient, random_user: User
+    ) -> None:
+        body = "\n".join(
+            [
+                json.dumps(
+                    {
+                        "email": "new@example.com",
+                        "password": "password123",
+                        "name": "New",
+                        "surname": "User",
+                    }
+                ),
+                json.dumps(
+                    {
+                        "email": random_user.email,
+                        "password": "password123",
+                        "name": "Dup",
+                        "surname": "User",
+                    }
+                ),
+                "not json",
+            ]
+        )
+        response = await client.post(
+            "/api/v1/users/import",
+            content=body,
+            headers={
+                "X-Admin-Key": "admin-key",
+                "Content-Type": "application/x-ndjson",
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        result = response.json()
+        assert result["inserted"] == 1
+        assert result["duplicates"] == [random_user.email]
+        assert [row["line"] for row in result["invalid"]] == [3]
+
+    @pytest.mark.usefixtures("saturated_hashing_pool")
+    async def test_import_users_hashing_pool_exhausted(
+        self, client: AsyncClient
+    ) -> None:
+        response = await client.post(
+            "/api/v1/users/import",
+            content="email,password,name,surname\nnew@example.com,password123,New,User",
+            headers={"X-Admin-Key": "admin-key", "Content-Type": "text/csv"},
+        )
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    async def test_import_users_unsupported_content_type(
+        self, client: AsyncClient
+    ) -> None:
+        response = await client.post(
+            "/api/v1/users/import",
+            content="{}",
+            headers={"X-Admin-Key": "admin-key", "Content-Type": "application/json"},
+        )
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    @pytest.mark.parametrize("headers", [{}, {"X-Admin-Key": "wrong"}])
+    async def test_import_users_invalid_admin_key(
+        self, client: AsyncClient, headers: dict[str, str]
+    ) -> None:
+        response = await client.post(
+            "/api/v1/users/import",
+            content="",
+            headers={**headers, "Content-Type": "text/csv"},
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_import_users_disabled(
+        self, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", None)
+        response = await client.post(
+            "/api/v1/users/import",
+            content="",
+            headers={"X-Admin-Key": "admin-key", "Content-Type": "text/csv"},
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -2,9 +2,10 @@ import pytest
 
 from fastapi_2fa_example.auth.utils import hash_password
 from fastapi_2fa_example.postgres import AsyncSession
-from fastapi_2fa_example.users.schemas import UserCreate
-from fastapi_2fa_example.users.service import user_service
-from tests.fixtures.database import SaveFixture
+from fastapi_2fa_example.redis import Redis
+from fastapi_2fa_example.users.schemas import User, UserCreate
+from fastapi_2fa_example.users.service import user_from_row, user_service
+from tests.fixtures.database import RefreshFixture, SaveFixture
 from tests.fixtures.random_objects import create_user
 
 
@@ -37,18 +38,68 @@ class TestGetByEmail:
 
 
 @pytest.mark.asyncio
-class TestGetAll:
-    async def test_get_all(
+class TestGetPage:
+    async def test_get_page(
         self, session: AsyncSession, save_fixture: SaveFixture
     ) -> None:
         users = [await create_user(save_fixture) for _ in range(3)]
-        users_fetched = await user_service.get_all(session)
-        assert len(users_fetched) == len(users)
-        assert all(user in users_fetched for user in users)
 
-    async def test_get_all_empty(self, session: AsyncSession) -> None:
-        users_fetched = await user_service.get_all(session)
-        assert users_fetched == []
+        first_page = await user_service.get_page(session, limit=2)
+        assert [row.id for row in first_page] == [user.id for user in users[:2]]
+        assert User.model_validate(
+            first_page[0], from_attributes=True
+        ) == User.model_validate(users[0], from_attributes=True)
+
+        second_page = await user_service.get_page(
+            session, limit=2, after_id=first_page[-1].id
+        )
+        assert [row.id for row in second_page] == [users[2].id]
+
+    async def test_get_page_empty(self, session: AsyncSession) -> None:
+        assert await user_service.get_page(session, limit=2) == []
+
+
+@pytest.mark.asyncio
+class TestGetRow:
+    async def test_get_row(
+        self, session: AsyncSession, save_fixture: SaveFixture
+    ) -> None:
+        user = await create_user(save_fixture)
+        row = await user_service.get_row(session, user.id)
+        assert row is not None
+        assert row._asdict() == {
+            "id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "surname": user.surname,
+            "requires_2fa": user.requires_2fa,
+        }
+
+    async def test_user_from_row(
+        self, session: AsyncSession, save_fixture: SaveFixture
+    ) -> None:
+        user = await create_user(save_fixture)
+        row = await user_service.get_row(session, user.id)
+        assert row is not None
+        assert user_from_row(row) == User.model_validate(user, from_attributes=True)
+
+    async def test_get_row_not_found(self, session: AsyncSession) -> None:
+        assert await user_service.get_row(session, 9999) is None
+
+
+@pytest.mark.asyncio
+class TestStreamAll:
+    async def test_stream_all(
+        self, session: AsyncSession, save_fixture: SaveFixture
+    ) -> None:
+        users = [await create_user(save_fixture) for _ in range(5)]
+        user_ids = [user.id for user in users]
+
+        chunks = [
+            [user.id for user in chunk]
+            async for chunk in user_service.stream_all(session, chunk_size=2)
+        ]
+        assert chunks == [user_ids[:2], user_ids[2:4], user_ids[4:]]
 
 
 @pytest.mark.asyncio
@@ -67,3 +118,104 @@ class TestAdd:
         user_fetched = await user_service.get(session, user.id)
         assert user_fetched is not None
         assert user_fetched == user
+
+    async def test_add_invalidates_cache(
+        self, session: AsyncSession, redis: Redis
+    ) -> None:
+        user_create = UserCreate(
+            email="test@example.com",
+            password_hash=hash_password("password"),
+            name="name",
+            surname="surname",
+            requires_2fa=False,
+        )
+        user = await user_service.add(session, user_create, redis=redis)
+        assert await redis.get(f"user:{user.id}") is None
+
+
+@pytest.mark.asyncio
+class TestAddIfNotExists:
+    async def test_add_if_not_exists(self, session: AsyncSession) -> None:
+        user_create = UserCreate(
+            email="test@example.com",
+            password_hash=hash_password("password"),
+            name="name",
+            surname="surname",
+            requires_2fa=True,
+        )
+        row = await user_service.add_if_not_exists(session, user_create)
+        assert row is not None
+        assert row.email == user_create.email
+        assert row.requires_2fa is True
+
+        user_fetched = await user_service.get(session, row.id)
+        assert user_fetched is not None
+        assert user_fetched.password_hash == user_create.password_hash
+        assert user_fetched.created_at is not None
+
+    async def test_add_if_not_exists_duplicated(
+        self, session: AsyncSession, redis: Redis, save_fixture: SaveFixture
+    ) -> None:
+        user = await create_user(save_fixture)
+        user_create = UserCreate(
+            email=user.email,
+            password_hash=hash_password("password"),
+            name="name",
+            surname="surname",
+        )
+        assert await user_service.add_if_not_exists(session, user_create, redis) is None
+
+        user_fetched = await user_service.get_by_email(session, user.email)
+        assert user_fetched is not None
+        assert user_fetched.name == user.name
+
+
+@pytest.mark.asyncio
+class TestGetCached:
+    async def test_get_cached(
+        self, session: AsyncSession, redis: Redis, save_fixture: SaveFixture
+    ) -> None:
+        user = await create_user(save_fixture)
+
+        user_fetched = await user_service.get_cached(session, redis, user.id)
+        assert user_fetched == User.model_validate(user, from_attributes=True)
+
+        cached = await redis.get(f"user:{user.id}")
+        assert cached is not None
+        assert User.model_validate_json(cached) == user_fetched
+
+        # served from the cache, even if the row changed meanwhile
+        user.name = "changed"
+        await save_fixture(user)
+        user_fetched = await user_service.get_cached(session, redis, user.id)
+        assert user_fetched is not None
+        assert user_fetched.name != "changed"
+
+        await user_service.invalidate(redis, user.id)
+        user_fetched = await user_service.get_cached(session, redis, user.id)
+        assert user_fetched is not None
+        assert user_fetched.name == "changed"
+
+    async def test_get_cached_not_found(
+        self, session: AsyncSession, redis: Redis
+    ) -> None:
+        assert await user_service.get_cached(session, redis, 9999) is None
+        assert await redis.get("user:9999") is None
+
+
+@pytest.mark.asyncio
+class TestUpdatePasswordHash:
+    async def test_update_password_hash(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        refresh_fixture: RefreshFixture,
+    ) -> None:
+        user = await create_user(save_fixture)
+        password_hash = hash_password("new_password")
+
+        await user_service.update_password_hash(session, user.id, password_hash)
+
+        await refresh_fixture(user)
+        assert user.password_hash == password_hash
+        assert user.updated_at is not None
@@ -0,0 +1,115 @@
+from collections.abc import AsyncGenerator
+from typing import cast
+
+import pytest
+import pytest_asyncio
+from redis.asyncio import BlockingConnectionPool
+from redis.asyncio.connection import Connection
+from sqlalchemy.pool import QueuePool
+
+from fastapi_2fa_example.config import settings
+from fastapi_2fa_example.postgres import AsyncEngine, create_async_engine
+from fastapi_2fa_example.redis import RedisAsyncConnectionPool
+from fastapi_2fa_example.warmup import (
+    Readiness,
+    warm_up_db_pool,
+    warm_up_hashing_pool,
+    warm_up_redis_pool,
+)
+
+
+@pytest_asyncio.fixture
+async def engine() -> AsyncGenerator[AsyncEngine]:
+    engine = create_async_engine(process_name="test", settings=settings)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+class TestWarmUp:
+    async def test_warm_up_db_pool(self, engine: AsyncEngine) -> None:
+        pool = cast(QueuePool, engine.pool)
+
+        assert await warm_up_db_pool(engine, 3) == 3
+        assert pool.checkedin() == 3
+        assert pool.checkedout() == 0
+
+    async def test_warm_up_db_pool_capped(self, engine: AsyncEngine) -> None:
+        pool = cast(QueuePool, engine.pool)
+
+        assert await warm_up_db_pool(engine, pool.size() + 10) == pool.size()
+        assert pool.checkedin() == pool.size()
+
+    async def test_warm_up_db_pool_failure(self) -> None:
+        engine = create_async_engine(
+            process_name="test",
+            settings=settings.model_copy(update={"POSTGRES_DATABASE": "missing"}),
+        )
+        with pytest.raises(Exception, match="missing"):
+            await warm_up_db_pool(engine, 3)
+        assert cast(QueuePool, engine.pool).checkedout() == 0
+        await engine.dispose()
+
+    async def test_warm_up_redis_pool(
+        self, redis_pool: RedisAsyncConnectionPool
+    ) -> None:
+        assert await warm_up_redis_pool(redis_pool, 3) == 3
+        assert len(redis_pool._available_connections) >= 3
+        assert len(redis_pool._in_use_connections) == 0
+
+    async def test_warm_up_redis_pool_checkout_failure(
+        self, redis_pool: RedisAsyncConnectionPool, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        get_connection = redis_pool.get_connection
+        calls = 0
+
+        async def fail_second_checkout() -> Connection:
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise ConnectionError("checkout failed")
+            return await get_connection()  # type: ignore[no-untyped-call]
+
+        monkeypatch.setattr(redis_pool, "get_connection", fail_second_checkout)
+        with pytest.raises(ConnectionError, match="checkout failed"):
+            await warm_up_redis_pool(redis_pool, 3)
+        assert len(redis_pool._in_use_connections) == 0
+
+    async def test_warm_up_hashing_pool(self) -> None:
+        assert await warm_up_hashing_pool() >= 1
+
+
+@pytest.mark.asyncio
+class TestReadiness:
+    async def test_start(
+        self, engine: AsyncEngine, redis_pool: RedisAsyncConnectionPool
+    ) -> None:
+        readiness = Readiness()
+        assert not readiness.warmed_up
+
+        readiness.start(engine, redis_pool)
+        assert readiness._task is not None
+        await readiness._task
+        assert readiness.warmed_up
+        assert cast(QueuePool, engine.pool).checkedin() > 0
+
+        await readiness.stop()
+        assert readiness._task is None
+
+    async def test_stop_during_warm_up(
+        self, engine: AsyncEngine, redis_pool: RedisAsyncConnectionPool
+    ) -> None:
+        readiness = Readiness()
+        readiness.start(engine, redis_pool)
+        await readiness.stop()
+
+        assert cast(QueuePool, engine.pool).checkedout() == 0
+
+    async def test_warm_up_failure(self, engine: AsyncEngine) -> None:
+        # nothing listens on port 1: the warm-up fails, readiness is not blocked
+        unreachable = BlockingConnectionPool(port=1, max_connections=1)
+        readiness = Readiness()
+
+        await readiness.warm_up(engine, unreachable, redis_connections=1)
+        assert readiness.warmed_up
+        await unreachable.aclose()
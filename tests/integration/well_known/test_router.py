@@ -0,0 +1,11 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_jwks(client: AsyncClient) -> None:
+    response = await client.get("/.well-known/jwks.json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"keys": []}  # HS256 secrets are never published
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
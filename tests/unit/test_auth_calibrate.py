@@ -0,0 +1,13 @@
+import pytest
+
+from fastapi_2fa_example.auth import calibrate
+
+
+def test_calibrate(capsys: pytest.CaptureFixture[str]) -> None:
+    calibrate.main(["--rounds", "1000", "2000", "--samples", "3"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["scheme", "rounds", "p50", "(ms)", "p99", "(ms)"]
+    assert [line.split()[:2] for line in lines[1:]] == [
+        ["sha256_crypt", "1000"],
+        ["sha256_crypt", "2000"],
+    ]
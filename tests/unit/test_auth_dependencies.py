@@ -1,10 +1,14 @@
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
 import pytest
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
+from prometheus_client import REGISTRY
 
-from fastapi_2fa_example.auth.dependencies import TokenValidator
+from fastapi_2fa_example.auth.dependencies import TokenCache, TokenValidator
 from fastapi_2fa_example.auth.schemas import Token, TokenType
-from fastapi_2fa_example.auth.utils import create_jwt_token
+from fastapi_2fa_example.auth.utils import create_jwt_token, decode_token
 
 
 def test_token_validator_valid():
@@ -39,3 +43,97 @@ def test_token_validator_invalid_token():
         validator(credentials)
     assert exc.value.status_code == 401
     assert "Invalid or expired token" in exc.value.detail
+
+
+def test_token_validator_cache_hit():
+    token_str = create_jwt_token(1, TokenType.ACCESS)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token_str)
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    validator = TokenValidator(TokenType.ACCESS, cache=cache)
+    hits = REGISTRY.get_sample_value("token_cache_hits_total")
+    misses = REGISTRY.get_sample_value("token_cache_misses_total")
+
+    with patch(
+        "fastapi_2fa_example.auth.dependencies.decode_token",
+        wraps=decode_token,
+    ) as mock_decode:
+        first = validator(credentials)
+        second = validator(credentials)
+
+    assert first == second
+    assert mock_decode.call_count == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert REGISTRY.get_sample_value("token_cache_hits_total") == hits + 1
+    assert REGISTRY.get_sample_value("token_cache_misses_total") == misses + 1
+    assert len(cache) == 1
+
+
+def test_token_validator_cache_invalid_type():
+    token_str = create_jwt_token(1, TokenType.LOGIN)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token_str)
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    validator = TokenValidator(TokenType.ACCESS, cache=cache)
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            validator(credentials)
+    assert cache.hits == 1
+
+
+def test_token_cache_expires_with_token():
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    token = Token(
+        user_id=1,
+        exp=datetime.now(tz=UTC) + timedelta(seconds=1),
+        type=TokenType.ACCESS,
+    )
+    cache.set("token", token)
+    assert cache.get("token") == token
+
+    with patch("fastapi_2fa_example.auth.dependencies.time.time") as mock_time:
+        mock_time.return_value = token.exp.timestamp() + 1
+        assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_token_cache_skips_expired_token():
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    token = Token(
+        user_id=1,
+        exp=datetime.now(tz=UTC) - timedelta(seconds=1),
+        type=TokenType.ACCESS,
+    )
+    cache.set("token", token)
+    assert len(cache) == 0
+
+
+def test_token_cache_lru_eviction():
+    cache = TokenCache(max_size=2, ttl_seconds=60)
+    exp = datetime.now(tz=UTC) + timedelta(minutes=10)
+    tokens = {
+        f"token-{i}": Token(user_id=i, exp=exp, type=TokenType.ACCESS) for i in range(3)
+    }
+    cache.set("token-0", tokens["token-0"])
+    cache.set("token-1", tokens["token-1"])
+    assert cache.get("token-0") is not None  # token-1 is now the least recently used
+    cache.set("token-2", tokens["token-2"])
+
+    assert len(cache) == 2
+    assert cache.get("token-1") is None
+    assert cache.get("token-0") == tokens["token-0"]
+    assert cache.get("token-2") == tokens["token-2"]
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == 0
+
+
+def test_token_cache_disabled():
+    cache = TokenCache(max_size=0, ttl_seconds=60)
+    token = Token(
+        user_id=1,
+        exp=datetime.now(tz=UTC) + timedelta(minutes=10),
+        type=TokenType.ACCESS,
+    )
+    cache.set("token", token)
+    assert cache.get("token") is None
@@ -0,0 +1,102 @@
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from pydantic import SecretStr
+
+from fastapi_2fa_example.auth import utils
+from fastapi_2fa_example.auth.keys import load_jwt_keys
+from fastapi_2fa_example.auth.schemas import TokenType
+from fastapi_2fa_example.config import Settings
+
+
+def private_pem(key: ed25519.Ed25519PrivateKey | rsa.RSAPrivateKey) -> str:
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode()
+
+
+def public_pem(key: ed25519.Ed25519PrivateKey | rsa.RSAPrivateKey) -> str:
+    return (
+        key.public_key()
+        .public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+
+
+def test_load_jwt_keys_symmetric():
+    keys = load_jwt_keys(Settings(JWT_ALGORITHM="HS256", JWT_SECRET=SecretStr("s")))
+    assert keys.signing_key == b"s"
+    assert keys.get_verification_key(None) == b"s"
+    assert keys.jwks == {"keys": []}
+
+
+def test_load_jwt_keys_unsupported_algorithm():
+    with pytest.raises(ValueError, match="Unsupported JWT algorithm"):
+        load_jwt_keys(Settings(JWT_ALGORITHM="none"))
+
+
+def test_load_jwt_keys_missing_private_key():
+    with pytest.raises(ValueError, match="JWT_PRIVATE_KEY is required"):
+        load_jwt_keys(Settings(JWT_ALGORITHM="EdDSA", JWT_PRIVATE_KEY=None))
+
+
+def test_load_jwt_keys_eddsa():
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    keys = load_jwt_keys(
+        Settings(
+            JWT_ALGORITHM="EdDSA",
+            JWT_PRIVATE_KEY=SecretStr(private_pem(private_key)),
+            JWT_KEY_ID="key-1",
+        )
+    )
+    assert keys.kid == "key-1"
+    [jwk] = keys.jwks["keys"]
+    assert jwk["kid"] == "key-1"
+    assert jwk["alg"] == "EdDSA"
+    assert jwk["kty"] == "OKP"
+    assert "d" not in jwk  # private part is never published
+
+
+def test_rs256_key_rotation(monkeypatch: pytest.MonkeyPatch):
+    old_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    old_keys = load_jwt_keys(
+        Settings(
+            JWT_ALGORITHM="RS256",
+            JWT_PRIVATE_KEY=SecretStr(private_pem(old_key)),
+            JWT_KEY_ID="old",
+        )
+    )
+    new_keys = load_jwt_keys(
+        Settings(
+            JWT_ALGORITHM="RS256",
+            JWT_PRIVATE_KEY=SecretStr(private_pem(new_key)),
+            JWT_KEY_ID="new",
+            JWT_PUBLIC_KEYS={"old": public_pem(old_key)},
+        )
+    )
+    assert {jwk["kid"] for jwk in new_keys.jwks["keys"]} == {"old", "new"}
+
+    monkeypatch.setattr(utils, "get_jwt_keys", lambda: old_keys)
+    old_token = utils.create_jwt_token(1, TokenType.ACCESS)
+    assert jwt.get_unverified_header(old_token)["kid"] == "old"
+
+    monkeypatch.setattr(utils, "get_jwt_keys", lambda: new_keys)
+    new_token = utils.create_jwt_token(2, TokenType.ACCESS)
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+
+    # tokens signed with the rotated key are still accepted
+    assert utils.decode_token(old_token).user_id == 1
+    assert utils.decode_token(new_token).user_id == 2
+
+    # tokens signed with an unknown key are rejected
+    monkeypatch.setattr(utils, "get_jwt_keys", lambda: old_keys)
+    with pytest.raises(ValueError, match="Failed to decode token"):
+        utils.decode_token(new_token)
@@ -1,3 +1,4 @@
+import pickle
 from datetime import UTC, datetime, timedelta
 
 import jwt
@@ -77,3 +78,65 @@ def test_generate_otp():
     assert isinstance(otp, str)
     assert len(otp) == 6
     assert otp.isdigit()
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_password_async():
+    password = "mysecretpassword"
+    hashed = await utils.hash_password_async(password)
+    assert hashed != password
+    assert await utils.verify_password_async(password, hashed)
+    assert not await utils.verify_password_async("wrongpassword", hashed)
+
+
+@pytest.mark.asyncio
+async def test_hashing_pool_exhausted():
+    pool = utils.PasswordHashingPool(
+        executor_type="thread", max_workers=1, max_pending=0
+    )
+    with pytest.raises(utils.HashingPoolExhaustedException):
+        await pool.run(utils.hash_password, "mysecretpassword")
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hashing_pool_thread_executor():
+    pool = utils.PasswordHashingPool(
+        executor_type="thread", max_workers=2, max_pending=4
+    )
+    hashed = await pool.run(utils.hash_password, "mysecretpassword")
+    assert utils.verify_password("mysecretpassword", hashed)
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+def test_password_hasher_needs_update():
+    old_hasher = utils.PasswordHasher(["sha256_crypt"], rounds=1000)
+    new_hasher = utils.PasswordHasher(["sha256_crypt"], rounds=2000)
+    hashed = old_hasher.hash("mysecretpassword")
+    assert not old_hasher.needs_update(hashed)
+    assert new_hasher.needs_update(hashed)
+    assert new_hasher.verify("mysecretpassword", hashed)
+
+
+def test_password_hasher_deprecated_scheme():
+    old_hasher = utils.PasswordHasher(["md5_crypt"])
+    new_hasher = utils.PasswordHasher(["sha256_crypt", "md5_crypt"], rounds=1000)
+    hashed = old_hasher.hash("mysecretpassword")
+    assert new_hasher.verify("mysecretpassword", hashed)
+    assert new_hasher.needs_update(hashed)
+    assert not new_hasher.needs_update(new_hasher.hash("mysecretpassword"))
+
+
+def test_password_hasher_no_schemes():
+    with pytest.raises(ValueError):
+        utils.PasswordHasher([])
+
+
+def test_password_hasher_pickle():
+    hasher = utils.PasswordHasher(["sha256_crypt"], rounds=1000)
+    unpickled = pickle.loads(pickle.dumps(hasher))
+    assert unpickled.schemes == hasher.schemes
+    assert unpickled.rounds == hasher.rounds
+    assert unpickled.verify("mysecretpassword", hasher.hash("mysecretpassword"))
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from fastapi_2fa_example.cache import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_calls_share_result(self) -> None:
+        single_flight: SingleFlight[str, int] = SingleFlight()
+        calls = 0
+
+        async def load() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(
+            *(single_flight.do("key", load) for _ in range(10))
+        )
+        assert results == [42] * 10
+        assert calls == 1
+
+        # once the call is done, the next one runs the loader again
+        assert await single_flight.do("key", load) == 42
+        assert calls == 2
+
+    async def test_exception_is_shared(self) -> None:
+        single_flight: SingleFlight[str, int] = SingleFlight()
+
+        async def load() -> int:
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(single_flight.do("key", load) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+    async def test_leader_cancelled(self) -> None:
+        single_flight: SingleFlight[str, int] = SingleFlight()
+        started = asyncio.Event()
+
+        async def slow_load() -> int:
+            started.set()
+            await asyncio.sleep(10)
+            return 1
+
+        async def fast_load() -> int:
+            return 2
+
+        leader = asyncio.create_task(single_flight.do("key", slow_load))
+        await started.wait()
+        waiter = asyncio.create_task(single_flight.do("key", fast_load))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # the waiter takes over and runs its own loader
+        assert await waiter == 2
+
+    async def test_waiter_cancelled(self) -> None:
+        single_flight: SingleFlight[str, int] = SingleFlight()
+        started = asyncio.Event()
+
+        async def load() -> int:
+            started.set()
+            await asyncio.sleep(0.05)
+            return 1
+
+        leader = asyncio.create_task(single_flight.do("key", load))
+        await started.wait()
+        waiter = asyncio.create_task(single_flight.do("key", load))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # the leader is not affected
+        assert await leader == 1
@@ -0,0 +1,68 @@
+import pytest
+
+from fastapi_2fa_example.config import Settings
+
+
+class TestPoolBudgets:
+    def test_default_budget(self) -> None:
+        settings = Settings(
+            POSTGRES_POOL_SIZE=5,
+            POSTGRES_POOL_OVERFLOW_SIZE=5,
+            REDIS_POOL_MAX_CONNECTIONS=200,
+        )
+        assert settings.get_postgres_pool_sizes() == (5, 5)
+        assert settings.get_redis_max_connections() == 200
+
+    def test_default_budget_is_divided_among_workers(self) -> None:
+        settings = Settings(
+            SERVER_WORKERS=16,
+            POSTGRES_POOL_SIZE=5,
+            POSTGRES_POOL_OVERFLOW_SIZE=5,
+            REDIS_POOL_MAX_CONNECTIONS=200,
+        )
+        assert settings.get_postgres_pool_sizes() == (3, 0)
+        assert settings.get_redis_max_connections() == 25
+
+    def test_budget_is_divided_among_workers(self) -> None:
+        settings = Settings(
+            SERVER_WORKERS=4,
+            POSTGRES_POOL_SIZE=5,
+            POSTGRES_POOL_OVERFLOW_SIZE=5,
+            POSTGRES_POOL_BUDGET=28,
+            REDIS_POOL_MAX_CONNECTIONS=200,
+            REDIS_POOL_BUDGET=100,
+        )
+        assert settings.get_postgres_pool_sizes() == (5, 2)
+        assert settings.get_redis_max_connections() == 25
+
+    def test_budget_smaller_than_workers(self) -> None:
+        settings = Settings(
+            SERVER_WORKERS=16,
+            POSTGRES_POOL_BUDGET=8,
+            REDIS_POOL_BUDGET=8,
+        )
+        assert settings.get_postgres_pool_sizes() == (1, 0)
+        assert settings.get_redis_max_connections() == 1
+
+    def test_single_process(self) -> None:
+        settings = Settings(POSTGRES_POOL_SIZE=5, POSTGRES_POOL_BUDGET=4)
+        assert settings.get_worker_count() == 1
+        assert settings.get_postgres_pool_sizes() == (4, 0)
+
+
+class TestPasswordHashWorkers:
+    def test_explicit(self) -> None:
+        assert (
+            Settings(
+                SERVER_WORKERS=4, PASSWORD_HASH_WORKERS=3
+            ).get_password_hash_workers()
+            == 3
+        )
+
+    def test_cores_are_divided_among_workers(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("os.process_cpu_count", lambda: 8)
+        assert Settings(SERVER_WORKERS=4).get_password_hash_workers() == 2
+        assert Settings(SERVER_WORKERS=16).get_password_hash_workers() == 1
+        assert Settings().get_password_hash_workers() == 8
@@ -0,0 +1,65 @@
+import pytest
+
+from fastapi_2fa_example.importtime import (
+    ImportProfile,
+    parse_importtime,
+    profile_import,
+)
+
+# (import, cold start) budgets in ms, about twice the times measured with
+# `uv run task importtime` on a development machine (main: 1.4 s and 1.6 s).
+# Wall-clock times depend on the machine: these tests are deselected by default,
+# run them with `uv run task import_budget`.
+BUDGETS = {
+    "fastapi_2fa_example.main": (2800, 3400),
+    "fastapi_2fa_example.users.bulk_import": (2000, 2400),
+    "fastapi_2fa_example.auth.calibrate": (1300, 1600),
+}
+
+# Heavy modules imported only by the code paths that use them
+LAZY_MODULES = {
+    "fastapi_2fa_example.main": {"opentelemetry.sdk.trace", "jwt"},
+    "fastapi_2fa_example.users.bulk_import": {"jwt", "cryptography", "httpx"},
+    "fastapi_2fa_example.auth.calibrate": {"jwt", "cryptography", "httpx", "fastapi"},
+}
+
+
+def test_parse_importtime() -> None:
+    output = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   fastapi_2fa_example.config",
+            "import time:        30 |        150 | fastapi_2fa_example",
+            "DEBUG something else",
+        ]
+    )
+    records = parse_importtime(output)
+    assert [(r.module, r.self_us, r.cumulative_us) for r in records] == [
+        ("fastapi_2fa_example.config", 120, 120),
+        ("fastapi_2fa_example", 30, 150),
+    ]
+
+    profile = ImportProfile(
+        module="fastapi_2fa_example", cold_start_seconds=0.2, records=records
+    )
+    assert profile.total_ms == 0.15
+    assert profile.by_package() == [("fastapi_2fa_example", 0.15)]
+    report = profile.report(top=1)
+    assert report.startswith("fastapi_2fa_example: cold start 200 ms, imports 0 ms")
+    assert "fastapi_2fa_example.config" not in report  # only the slowest module
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_lazy_imports(module: str) -> None:
+    profile = profile_import(module)
+    assert not profile.modules & LAZY_MODULES[module], profile.report()
+
+
+@pytest.mark.import_budget
+@pytest.mark.parametrize("module", BUDGETS)
+def test_import_budget(module: str) -> None:
+    import_budget_ms, cold_start_budget_ms = BUDGETS[module]
+    profile = profile_import(module)
+
+    assert profile.total_ms < import_budget_ms, profile.report()
+    assert profile.cold_start_seconds * 1000 < cold_start_budget_ms, profile.report()
@@ -0,0 +1,185 @@
+import asyncio
+import json
+from typing import Any
+
+import httpx
+import pytest
+
+from fastapi_2fa_example.config import Environment, settings
+from fastapi_2fa_example.http_client import create_http_client
+from fastapi_2fa_example.mail_sender import (
+    BODY_SUBSTITUTION_TAG,
+    SENDGRID_URL,
+    email_batcher,
+    send_email,
+    sendgrid_mock_transport,
+    sendgrid_mounts,
+)
+
+
+@pytest.fixture
+def sendgrid_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ENV", Environment.development)
+    monkeypatch.setattr(settings, "ENABLE_SENDGRID", True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("sendgrid_enabled")
+async def test_send_email_reuses_client() -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(202)
+
+    async with create_http_client(
+        mounts={SENDGRID_URL: httpx.MockTransport(handler)}
+    ) as client:
+        for _ in range(2):
+            await send_email("john@example.com", "Subject", "Body", client=client)
+
+    assert len(requests) == 2
+    assert requests[0].url == f"{SENDGRID_URL}/v3/mail/send"
+    assert requests[0].headers["Authorization"].startswith("Bearer ")
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("sendgrid_enabled")
+async def test_send_email_error() -> None:
+    transport = httpx.MockTransport(lambda _: httpx.Response(500))
+    async with create_http_client(mounts={SENDGRID_URL: transport}) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await send_email("john@example.com", "Subject", "Body", client=client)
+
+
+@pytest.mark.asyncio
+async def test_send_email_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ENV", Environment.development)
+    transport = httpx.MockTransport(lambda _: httpx.Response(500))
+    async with create_http_client(mounts={SENDGRID_URL: transport}) as client:
+        await send_email("john@example.com", "Subject", "Body", client=client)
+
+
+@pytest.mark.asyncio
+async def test_sendgrid_mock_transport() -> None:
+    async with create_http_client(
+        mounts={SENDGRID_URL: sendgrid_mock_transport()}
+    ) as client:
+        response = await client.post(
+            f"{SENDGRID_URL}/v3/mail/send",
+            json={
+                "personalizations": [{"to": [{"email": "john@example.com"}]}],
+                "from": {"email": "noreply@example.com"},
+                "content": [{"type": "text/plain", "value": "Body"}],
+            },
+        )
+        assert response.status_code == 202
+        response = await client.post(f"{SENDGRID_URL}/v3/mail/send", json={})
+        assert response.status_code == 400
+        response = await client.post(f"{SENDGRID_URL}/v3/unknown")
+        assert response.status_code == 404
+
+
+def test_sendgrid_mounts(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert sendgrid_mounts() == {}
+    monkeypatch.setattr(settings, "SENDGRID_MOCK", True)
+    assert list(sendgrid_mounts()) == [SENDGRID_URL]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("sendgrid_enabled")
+class TestBatching:
+    async def test_concurrent_emails_batched(self) -> None:
+        requests: list[dict[str, Any]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(202)
+
+        async with create_http_client(
+            mounts={SENDGRID_URL: httpx.MockTransport(handler)}
+        ) as client:
+            await asyncio.gather(
+                *(
+                    send_email(f"user{i}@example.com", "Subject", f"Body {i}", client)
+                    for i in range(3)
+                )
+            )
+
+        [request] = requests
+        assert request["content"] == [
+            {"type": "text/plain", "value": BODY_SUBSTITUTION_TAG}
+        ]
+        assert request["personalizations"] == [
+            {
+                "to": [{"email": f"user{i}@example.com"}],
+                "subject": "Subject",
+                "substitutions": {BODY_SUBSTITUTION_TAG: f"Body {i}"},
+            }
+            for i in range(3)
+        ]
+
+    async def test_max_batch_size(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(email_batcher, "max_batch_size", 2)
+        sizes: list[int] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sizes.append(len(json.loads(request.content)["personalizations"]))
+            return httpx.Response(202)
+
+        async with create_http_client(
+            mounts={SENDGRID_URL: httpx.MockTransport(handler)}
+        ) as client:
+            await asyncio.gather(
+                *(
+                    send_email(f"user{i}@example.com", "Subject", "Body", client)
+                    for i in range(5)
+                )
+            )
+
+        assert sorted(sizes) == [1, 2, 2]
+
+    async def test_failed_batch_split(self) -> None:
+        sizes: list[int] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            personalizations = json.loads(request.content)["personalizations"]
+            sizes.append(len(personalizations))
+            emails = [p["to"][0]["email"] for p in personalizations]
+            return httpx.Response(400 if "invalid@example.com" in emails else 202)
+
+        async with create_http_client(
+            mounts={SENDGRID_URL: httpx.MockTransport(handler)}
+        ) as client:
+            results = await asyncio.gather(
+                *(
+                    send_email(to_email, "Subject", "Body", client)
+                    for to_email in ("a@example.com", "invalid@example.com")
+                ),
+                return_exceptions=True,
+            )
+
+        assert results[0] is None
+        assert isinstance(results[1], httpx.HTTPStatusError)
+        assert sizes == [2, 1, 1]
+
+    async def test_cancelled_sender(self) -> None:
+        sizes: list[int] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sizes.append(len(json.loads(request.content)["personalizations"]))
+            return httpx.Response(202)
+
+        async with create_http_client(
+            mounts={SENDGRID_URL: httpx.MockTransport(handler)}
+        ) as client:
+            cancelled = asyncio.create_task(
+                send_email("a@example.com", "Subject", "Body", client)
+            )
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await send_email("b@example.com", "Subject", "Body", client)
+
+        assert cancelled.cancelled()
+        # already queued emails are still sent
+        assert sizes == [2]
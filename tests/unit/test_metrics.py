@@ -0,0 +1,68 @@
+import pathlib
+
+import pytest
+from prometheus_client import REGISTRY
+from redis.asyncio import BlockingConnectionPool
+from sqlalchemy.pool import QueuePool
+
+from fastapi_2fa_example.metrics import PoolCollector, get_registry, observe
+
+
+def _sample(name: str, labels: dict[str, str] | None = None) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestObserve:
+    def test_records_duration(self) -> None:
+        labels = {"operation": "test_observe"}
+        before = _sample("operation_duration_seconds_count", labels)
+
+        with observe("test_observe"):
+            pass
+
+        assert _sample("operation_duration_seconds_count", labels) == before + 1
+
+    def test_records_duration_on_error(self) -> None:
+        labels = {"operation": "test_observe_error"}
+
+        with pytest.raises(ValueError), observe("test_observe_error"):
+            raise ValueError("boom")
+
+        assert _sample("operation_duration_seconds_count", labels) == 1
+
+
+class TestPoolCollector:
+    def test_collect(self) -> None:
+        collector = PoolCollector()
+        db_pool = QueuePool(lambda: None, pool_size=7)  # type: ignore[arg-type]
+        redis_pool = BlockingConnectionPool(max_connections=3)
+        collector.track_db_pool(db_pool)
+        collector.track_redis_pool(redis_pool)
+
+        samples = {
+            metric.name: metric.samples[0].value for metric in collector.collect()
+        }
+        assert samples == {
+            "db_pool_connections_in_use": 0,
+            "db_pool_connections_idle": 0,
+            "db_pool_size": 7,
+            "redis_pool_connections_in_use": 0,
+            "redis_pool_connections_idle": 0,
+            "redis_pool_max_connections": 3,
+        }
+
+
+class TestGetRegistry:
+    def test_single_process(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+        assert get_registry() is REGISTRY
+
+    def test_multiprocess(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+    ) -> None:
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        registry = get_registry()
+        assert registry is not REGISTRY
+        names = {metric.name for metric in registry.collect()}
+        assert "db_pool_connections_in_use" in names
@@ -0,0 +1,43 @@
+import json
+
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from fastapi_2fa_example.responses import json_response
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+class ItemRow:
+    def __init__(self, id: int, name: str) -> None:
+        self.id = id
+        self.name = name
+
+
+class TestJSONResponse:
+    def test_serializes_objects(self) -> None:
+        response = json_response(
+            TypeAdapter(list[Item]),
+            [ItemRow(1, "first"), Item(id=2, name="second")],
+            status_code=status.HTTP_201_CREATED,
+            headers={"X-Test": "1"},
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.media_type == "application/json"
+        assert response.headers["X-Test"] == "1"
+        assert json.loads(response.body) == [
+            {"id": 1, "name": "first"},
+            {"id": 2, "name": "second"},
+        ]
+
+    def test_matches_default_response(self) -> None:
+        item = Item(id=1, name="é")
+        assert (
+            json_response(TypeAdapter(Item), item).body
+            == ORJSONResponse(item.model_dump()).body
+        )
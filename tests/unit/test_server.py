@@ -0,0 +1,32 @@
+import pytest
+
+from fastapi_2fa_example import server
+from fastapi_2fa_example.config import Settings
+
+
+def test_get_server_options(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        server,
+        "settings",
+        Settings(SERVER_PORT=9000, SERVER_MAX_REQUESTS=10_000, SERVER_LOOP="uvloop"),
+    )
+
+    options = server.get_server_options(workers=4)
+    assert options["workers"] == 4
+    assert options["port"] == 9000
+    assert options["loop"] == "uvloop"
+    assert options["http"] == "httptools"
+    assert options["limit_max_requests"] == 10_000
+    assert options["forwarded_allow_ips"] == "127.0.0.1"
+
+
+def test_get_server_options_forwarded_allow_ips(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(
+        server, "settings", Settings(SERVER_FORWARDED_ALLOW_IPS="10.0.0.0/8")
+    )
+
+    options = server.get_server_options(workers=1)
+    assert options["proxy_headers"]
+    assert options["forwarded_allow_ips"] == "10.0.0.0/8"